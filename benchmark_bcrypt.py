@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark login throughput across bcrypt cost factors
+
+For each cost (BCRYPT_ROUNDS) measures the latency of one hash and one verify
+(the work of /register and /token) and the logins per second sustained by a
+PasswordHasherPool of 1..N worker processes, to choose BCRYPT_ROUNDS and
+BCRYPT_WORKERS deliberately. A login should stay well under ~300 ms at the
+target concurrency.
+
+Usage: python benchmark_bcrypt.py [rounds...]   (default: 10 11 12 13)
+       BENCH_WORKERS=4 BENCH_LOGINS=16 python benchmark_bcrypt.py 12
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from password_pool import PasswordHasherPool, pwd_context
+
+PASSWORD = "correct horse battery staple"
+
+
+def per_call_ms(func, calls=3):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1000
+
+
+def pool_logins_per_second(hashed, workers, logins):
+    """Verifies per second through a started pool, from `logins` concurrent request threads"""
+    pool = PasswordHasherPool(workers=workers, max_pending=logins)
+    pool.start()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=logins) as threads:
+            results = list(threads.map(lambda _: pool.verify(PASSWORD, hashed), range(logins)))
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.stop()
+    assert all(results)
+    return logins / elapsed
+
+
+def run(rounds, max_workers, logins):
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = context.hash(PASSWORD)
+    hash_ms = per_call_ms(lambda: context.hash(PASSWORD))
+    verify_ms = per_call_ms(lambda: context.verify(PASSWORD, hashed))
+
+    print(f"\nbcrypt cost {rounds}")
+    print(f"  hash   (register): {hash_ms:8.1f} ms")
+    print(f"  verify (login):    {verify_ms:8.1f} ms   -> {1000 / verify_ms:6.1f} logins/s per core")
+    for workers in range(1, max_workers + 1):
+        rate = pool_logins_per_second(hashed, workers, logins)
+        print(f"  pool {workers} worker(s), {logins} concurrent logins: {rate:6.1f} logins/s")
+
+
+if __name__ == "__main__":
+    rounds_list = [int(arg) for arg in sys.argv[1:]] or [10, 11, 12, 13]
+    max_workers = int(os.getenv("BENCH_WORKERS", str(os.cpu_count() or 1)))
+    logins = int(os.getenv("BENCH_LOGINS", "8"))
+    print("bcrypt login throughput benchmark")
+    print(f"backend: {pwd_context.handler('bcrypt').get_backend()}, cpus: {os.cpu_count()}")
+    for rounds in rounds_list:
+        run(rounds, max_workers, logins)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON encoding and compression of typical signal list responses
+
+Compares FastAPI's default path for dict responses (jsonable_encoder + json.dumps,
+as JSONResponse does) with orjson, and the body size/CPU of gzip and brotli
+(if installed) for /api/vps/signals/live-shaped payloads.
+
+Usage: python benchmark_serialization.py [sizes...]   (default: 20 100 1000)
+"""
+
+import gzip
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY", "USDCHF", "AUDUSD", "USDCAD", "NZDUSD", "XAUUSD"]
+ANALYSIS = (
+    "Strong bullish momentum detected on H1. RSI recovering from oversold, MACD histogram "
+    "turning positive, price holding above the 200 EMA with rising volume. Key resistance "
+    "at the previous daily high; invalidation below the last swing low."
+)
+
+
+def live_signals_body(count):
+    """Body shaped like /api/vps/signals/live (format_live_signal entries)"""
+    now = datetime.utcnow()
+    signals = []
+    for i in range(count):
+        price = round(random.uniform(0.6, 1.9), 5)
+        signals.append({
+            "id": 100000 + i,
+            "symbol": random.choice(SYMBOLS),
+            "signal_type": random.choice(["BUY", "SELL"]),
+            "entry_price": price,
+            "stop_loss": round(price - 0.005, 5),
+            "take_profit": round(price + 0.015, 5),
+            "reliability": round(random.uniform(60, 95), 1),
+            "explanation": ANALYSIS[:200] + "...",
+            "analysis_truncated": True,
+            "timestamp": (now - timedelta(minutes=i)).isoformat(),
+            "timeframe": "H1",
+            "risk_reward": 3.0,
+            "technical_scores": {},
+            "volume": 0.01,
+            "vps_id": "vps-001"
+        })
+    return {
+        "status": "success",
+        "source": "DATABASE_VPS_PUSH",
+        "signals": signals,
+        "count": count,
+        "vps_status": "active",
+        "timestamp": now,
+        "message": f"Loaded {count} signals from database"
+    }
+
+
+def default_encode(body):
+    # jsonable_encoder + JSONResponse.render
+    return json.dumps(
+        jsonable_encoder(body), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def orjson_encode(body):
+    return orjson.dumps(body, option=orjson.OPT_NON_STR_KEYS)
+
+
+def per_call_us(func, arg, min_time=0.5):
+    """Mean microseconds per call over at least min_time seconds"""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        func(arg)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / calls * 1e6
+
+
+def run(count):
+    body = live_signals_body(count)
+    raw = orjson_encode(body)
+    default_us = per_call_us(default_encode, body)
+    orjson_us = per_call_us(orjson_encode, body)
+
+    print(f"\n{count} signals")
+    print(f"  encode  default (jsonable_encoder + json): {default_us:10.1f} us")
+    print(f"  encode  orjson:                            {orjson_us:10.1f} us   ({default_us / orjson_us:.1f}x faster)")
+
+    gzip_body = gzip.compress(raw, compresslevel=6)
+    gzip_us = per_call_us(lambda data: gzip.compress(data, compresslevel=6), raw)
+    print(f"  bytes   raw: {len(raw):9d}")
+    print(f"  bytes   gzip-6: {len(gzip_body):6d} ({len(gzip_body) / len(raw):.0%})  compress {gzip_us:8.1f} us")
+    if brotli is not None:
+        brotli_body = brotli.compress(raw, quality=4)
+        brotli_us = per_call_us(lambda data: brotli.compress(data, quality=4), raw)
+        print(f"  bytes   br-4:   {len(brotli_body):6d} ({len(brotli_body) / len(raw):.0%})  compress {brotli_us:8.1f} us")
+    else:
+        print("  bytes   br-4:   (brotli not installed)")
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20, 100, 1000]
+    print("Signal list serialization benchmark")
+    for size in sizes:
+        run(size)
@@ -0,0 +1,83 @@
+"""
+Response compression middleware (brotli or gzip)
+
+Single-body responses larger than minimum_size are compressed with brotli
+when the client accepts it and the optional `brotli` package is installed,
+otherwise with gzip. Streaming responses (SSE, large files) and bodies that
+already carry a Content-Encoding are passed through untouched, so the signal
+stream is never buffered.
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+def _accepted_encodings(scope):
+    for name, value in scope["headers"]:
+        if name == b"accept-encoding":
+            return {token.split(";")[0].strip() for token in value.decode("latin-1").lower().split(",")}
+    return set()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete response bodies above minimum_size"""
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = _accepted_encodings(scope)
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                # Held until the first body chunk tells whether the response streams
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = [(name, value) for name, value in start["headers"]]
+            header_names = {name.lower() for name, _ in headers}
+            if message.get("more_body") or len(body) < self.minimum_size or b"content-encoding" in header_names:
+                await send(start)
+                await send(message)
+                return
+
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b"Accept-Encoding")
+            ]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,244 @@
+"""
+Write-behind ingest journal for VPS pushes
+
+Accepted signals/heartbeats are appended (and fsync'ed, one fsync shared by
+concurrent appends) to a local append-only file and acked immediately; a background writer thread group-commits them to
+the database in batches. A checkpoint file stores the last committed sequence
+number so that, on startup, entries left unflushed are replayed.
+
+Delivery to the database is at-least-once: a crash between the DB commit and
+the checkpoint write replays the last batch.
+
+A batch rejected with a permanent error (is_permanent_error, e.g. a value the
+DB cannot store) is split in halves until the offending entries are isolated;
+those are appended to the dead-letter file `<path>.dead` and the rest is
+committed, so one bad entry never blocks the entries behind it. Other errors
+(DB unreachable) keep the batch pending and are retried with backoff.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from itertools import islice
+
+
+class IngestJournal:
+    """Append-only journal with a background group-commit writer"""
+
+    def __init__(self, path, flush_handler, flush_interval=0.2, max_batch=500, compact_bytes=16 * 1024 * 1024,
+                 is_permanent_error=lambda error: False):
+        # flush_handler(entries) must write the entries to the DB in one transaction
+        # and raise on failure; is_permanent_error(error) tells a rejected entry
+        # (isolated and dead-lettered) from a transient failure (retried)
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint"
+        self.dead_letter_path = f"{path}.dead"
+        self.flush_handler = flush_handler
+        self.is_permanent_error = is_permanent_error
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.compact_bytes = compact_bytes
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_seq = 0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._pending = deque()
+        self._file = None
+        self._thread = None
+        self._seq = 0
+        self._committed_seq = 0
+
+        self.appended = 0
+        self.committed = 0
+        self.replayed = 0
+        self.flush_failures = 0
+        self.dead_lettered = 0
+        self.fsyncs = 0
+        self.last_error = None
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Replay unflushed entries and start the background writer"""
+        self._committed_seq = self._read_checkpoint()
+        self._seq = self._committed_seq
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write at the tail after a crash - never acked, skip it
+                        continue
+                    self._seq = max(self._seq, entry["seq"])
+                    if entry["seq"] > self._committed_seq:
+                        self._pending.append(entry)
+            self.replayed = len(self._pending)
+            if self.replayed:
+                print(f"Ingest journal: replaying {self.replayed} unflushed entries")
+
+        self._synced_seq = self._seq
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-journal-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stop the writer after a last flush attempt"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    # ---------- write path ----------
+
+    def append(self, kind, payload):
+        """Durably append an entry and return its sequence number"""
+        return self.append_many(kind, [payload])[0]
+
+    def append_many(self, kind, payloads):
+        """Durably append entries with a single write/fsync; returns their sequence numbers"""
+        received_at = datetime.now().isoformat()
+        with self._lock:
+            entries = []
+            for payload in payloads:
+                self._seq += 1
+                entries.append({"seq": self._seq, "kind": kind, "received_at": received_at, "payload": payload})
+            self._file.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+            self._file.flush()
+            self._pending.extend(entries)
+            self.appended += len(entries)
+            backlog = len(self._pending)
+
+        self._sync(entries[-1]["seq"])
+        if backlog >= self.max_batch:
+            self._wakeup.set()
+        return [entry["seq"] for entry in entries]
+
+    def _sync(self, seq):
+        """Return once entries up to seq are fsync'ed (group commit)
+
+        fsync runs outside the append lock: appends keep writing while one
+        thread syncs, and the next sync covers every append made meanwhile,
+        so concurrent pushes share fsyncs instead of queueing for one each.
+        """
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._lock:
+                target = self._seq
+                fileno = self._file.fileno()
+            os.fsync(fileno)
+            self._synced_seq = target
+            self.fsyncs += 1
+
+    # ---------- background writer ----------
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Group-commit pending entries, one batch per transaction"""
+        while True:
+            with self._lock:
+                batch = list(islice(self._pending, self.max_batch))
+            if not batch:
+                return
+
+            done = self._flush_entries(batch)
+            if done:
+                with self._lock:
+                    for _ in range(done):
+                        self._pending.popleft()
+                    self._committed_seq = batch[done - 1]["seq"]
+                    self._write_checkpoint()
+                    self._maybe_compact()
+            if done < len(batch):
+                print(f"Ingest journal flush error ({len(batch) - done} entries pending retry): {self.last_error}")
+                # Back off instead of hammering a struggling DB
+                self._stop.wait(min(5.0, self.flush_interval * (2 ** min(self.flush_failures, 5))))
+                return
+            self.flush_failures = 0
+
+    def _flush_entries(self, entries):
+        """Commit entries in order; returns how many leading entries are done (committed or dead-lettered)"""
+        try:
+            self.flush_handler(entries)
+        except Exception as e:
+            if not self.is_permanent_error(e):
+                self.flush_failures += 1
+                self.last_error = str(e)
+                return 0
+            if len(entries) == 1:
+                self._dead_letter(entries[0], e)
+                return 1
+            middle = len(entries) // 2
+            done = self._flush_entries(entries[:middle])
+            if done < middle:
+                return done
+            return middle + self._flush_entries(entries[middle:])
+        self.committed += len(entries)
+        return len(entries)
+
+    def _dead_letter(self, entry, error):
+        """Set aside an entry the DB rejects, with the error, for inspection/manual replay"""
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead_file:
+            dead_file.write(json.dumps({**entry, "error": str(error)}, separators=(",", ":")) + "\n")
+            dead_file.flush()
+            os.fsync(dead_file.fileno())
+        self.dead_lettered += 1
+        self.last_error = str(error)
+        print(f"Ingest journal: entry {entry['seq']} ({entry['kind']}) rejected, moved to {self.dead_letter_path}: {error}")
+
+    # ---------- checkpoint / compaction ----------
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as checkpoint_file:
+                return int(checkpoint_file.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_checkpoint(self):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as checkpoint_file:
+            checkpoint_file.write(str(self._committed_seq))
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _maybe_compact(self):
+        # Everything is committed: the journal content is no longer needed
+        if not self._pending and self._file and self._file.tell() >= self.compact_bytes:
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "path": self.path,
+            "pending": pending,
+            "last_seq": self._seq,
+            "committed_seq": self._committed_seq,
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "committed": self.committed,
+            "replayed": self.replayed,
+            "flush_failures": self.flush_failures,
+            "dead_lettered": self.dead_lettered,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,151 @@
+"""
+Instrument registry for quote conversion
+
+Every instrument is described once (normalized symbol, asset class, pip size,
+digits, typical spread) instead of re-deriving it per quote with string
+heuristics. Broker symbol variants coming from the bridge ("eurusd",
+"EUR/USD", "EURUSD.m", "XAUUSDm", "US30#") are resolved to the canonical
+instrument through a lookup cache, so converting a payload is one dict lookup
+per signal whatever the size of the symbol universe.
+
+Extra instruments (or overrides) can be loaded from a JSON file: a list of
+{"symbol", "asset_class", "pip_size", "digits", "spread_pips"} objects.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+
+# Broker suffixes appended to symbol names (EURUSD.m, EURUSD.pro, US30#, EURUSD+)
+_SUFFIX_RE = re.compile(r"([.#+!].*)$")
+_SEPARATORS_RE = re.compile(r"[/\-_ ]")
+
+_CURRENCIES = {"USD", "EUR", "GBP", "JPY", "CHF", "CAD", "AUD", "NZD", "SEK", "NOK", "DKK",
+               "PLN", "HUF", "CZK", "TRY", "ZAR", "MXN", "SGD", "HKD", "CNH"}
+
+
+@dataclass(frozen=True)
+class Instrument:
+    symbol: str
+    asset_class: str
+    pip_size: float
+    digits: int
+    spread: float  # typical spread in price units (pip_size * spread_pips)
+
+    @classmethod
+    def create(cls, symbol, asset_class, pip_size, digits, spread_pips):
+        return cls(symbol, asset_class, pip_size, digits, round(pip_size * spread_pips, digits))
+
+
+def _fx(symbol, spread_pips):
+    if symbol.endswith("JPY"):
+        return Instrument.create(symbol, "forex", 0.01, 3, spread_pips)
+    return Instrument.create(symbol, "forex", 0.0001, 5, spread_pips)
+
+
+DEFAULT_INSTRUMENTS = [
+    # Majors
+    _fx("EURUSD", 1.0), _fx("GBPUSD", 1.2), _fx("USDJPY", 1.0), _fx("USDCHF", 1.5),
+    _fx("USDCAD", 1.5), _fx("AUDUSD", 1.2), _fx("NZDUSD", 1.5),
+    # Crosses
+    _fx("EURGBP", 1.5), _fx("EURJPY", 1.8), _fx("EURCHF", 2.0), _fx("EURAUD", 2.5),
+    _fx("EURCAD", 2.5), _fx("EURNZD", 3.0), _fx("GBPJPY", 2.5), _fx("GBPCHF", 3.0),
+    _fx("GBPAUD", 3.0), _fx("GBPCAD", 3.0), _fx("GBPNZD", 4.0), _fx("AUDJPY", 2.0),
+    _fx("AUDCAD", 2.5), _fx("AUDCHF", 2.5), _fx("AUDNZD", 3.0), _fx("CADJPY", 2.5),
+    _fx("CHFJPY", 2.5), _fx("NZDJPY", 2.5), _fx("CADCHF", 3.0), _fx("NZDCAD", 3.0),
+    _fx("NZDCHF", 3.0),
+    # Metals
+    Instrument.create("XAUUSD", "metal", 0.01, 2, 25), Instrument.create("XAGUSD", "metal", 0.001, 3, 25),
+    Instrument.create("XPTUSD", "metal", 0.01, 2, 300), Instrument.create("XPDUSD", "metal", 0.01, 2, 500),
+    # Indices
+    Instrument.create("US30", "index", 1.0, 1, 2), Instrument.create("NAS100", "index", 1.0, 1, 1),
+    Instrument.create("SPX500", "index", 0.1, 1, 5), Instrument.create("GER40", "index", 1.0, 1, 1),
+    Instrument.create("UK100", "index", 1.0, 1, 1), Instrument.create("JP225", "index", 1.0, 0, 7),
+    Instrument.create("FRA40", "index", 1.0, 1, 1), Instrument.create("AUS200", "index", 1.0, 1, 1),
+    # Crypto
+    Instrument.create("BTCUSD", "crypto", 1.0, 2, 30), Instrument.create("ETHUSD", "crypto", 0.1, 2, 20),
+    Instrument.create("LTCUSD", "crypto", 0.01, 2, 10), Instrument.create("XRPUSD", "crypto", 0.0001, 5, 10),
+    # Energies
+    Instrument.create("USOIL", "energy", 0.01, 2, 3), Instrument.create("UKOIL", "energy", 0.01, 2, 3),
+    Instrument.create("NGAS", "energy", 0.001, 3, 10),
+]
+
+# Common broker aliases of the instruments above
+DEFAULT_ALIASES = {
+    "GOLD": "XAUUSD", "SILVER": "XAGUSD", "DJ30": "US30", "DOW30": "US30", "WS30": "US30",
+    "USTEC": "NAS100", "NDX100": "NAS100", "US100": "NAS100", "US500": "SPX500", "SP500": "SPX500",
+    "DE40": "GER40", "DAX40": "GER40", "GER30": "GER40", "FTSE100": "UK100", "JPN225": "JP225",
+    "NIKKEI225": "JP225", "WTI": "USOIL", "XTIUSD": "USOIL", "BRENT": "UKOIL", "XBRUSD": "UKOIL",
+    "XNGUSD": "NGAS", "BITCOIN": "BTCUSD", "ETHEREUM": "ETHUSD",
+}
+
+
+class InstrumentRegistry:
+    """Canonical instruments plus a cache of resolved raw bridge symbols"""
+
+    MAX_RESOLVED = 10000
+
+    def __init__(self, instruments=DEFAULT_INSTRUMENTS, aliases=DEFAULT_ALIASES):
+        self._instruments = {instrument.symbol: instrument for instrument in instruments}
+        self._aliases = dict(aliases)
+        self._resolved = {}  # raw symbol -> Instrument or None
+
+    def add(self, instrument):
+        self._instruments[instrument.symbol] = instrument
+        self._resolved.clear()
+
+    def load_file(self, path):
+        """Add/override instruments from a JSON file"""
+        with open(path) as f:
+            for item in json.load(f):
+                self.add(Instrument.create(
+                    item["symbol"].upper(), item.get("asset_class", "other"), float(item["pip_size"]),
+                    int(item["digits"]), float(item.get("spread_pips", 1.0))
+                ))
+                for alias in item.get("aliases", []):
+                    self._aliases[alias.upper()] = item["symbol"].upper()
+
+    def __len__(self):
+        return len(self._instruments)
+
+    def _lookup(self, name):
+        name = self._aliases.get(name, name)
+        return self._instruments.get(name)
+
+    def _derive(self, name):
+        """Instrument for a symbol missing from the table (FX pairs only)"""
+        if len(name) == 6 and name[:3] in _CURRENCIES and name[3:] in _CURRENCIES:
+            return _fx(name, 2.0)
+        return None
+
+    def resolve(self, raw_symbol, remember=True):
+        """Instrument for a bridge symbol in any broker spelling, or None if unknown
+
+        Only symbols from the bridge feed are remembered (remember=True): request
+        input (normalize) is looked up in the cache but never added to it, so
+        arbitrary query parameters cannot fill it up.
+        """
+        try:
+            return self._resolved[raw_symbol]
+        except KeyError:
+            pass
+        if not raw_symbol:
+            return None
+
+        name = _SEPARATORS_RE.sub("", raw_symbol.strip().upper())
+        base = _SUFFIX_RE.sub("", name)
+        instrument = self._lookup(name) or self._lookup(base)
+        if instrument is None and base.endswith("M"):
+            # Micro/mini account suffix: EURUSDm
+            instrument = self._lookup(base[:-1])
+        if instrument is None:
+            instrument = self._derive(base) or (self._derive(base[:-1]) if base.endswith("M") else None)
+
+        if remember and len(self._resolved) < self.MAX_RESOLVED:
+            self._resolved[raw_symbol] = instrument
+        return instrument
+
+    def normalize(self, raw_symbol):
+        """Canonical symbol name (the raw name upper-cased if unknown), for request input"""
+        instrument = self.resolve(raw_symbol, remember=False)
+        return instrument.symbol if instrument else raw_symbol.strip().upper()
@@ -1,13 +1,19 @@
 import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, update
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import User
+from database import SessionLocal, get_database
+from models import RefreshToken, User
+from password_pool import PasswordHasherPool
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -15,19 +21,25 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated user cache (token subject -> AuthUser)
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+
+# Password hashing: bcrypt worker processes and max hash/verify calls in flight
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(2, os.cpu_count() or 1))))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", str(BCRYPT_WORKERS * 4)))
+password_hasher = PasswordHasherPool(workers=BCRYPT_WORKERS, max_pending=BCRYPT_MAX_PENDING)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 def hash_password(password: str) -> str:
-    """Hash password with bcrypt"""
-    return pwd_context.hash(password)
+    """Hash password with bcrypt (in the password_hasher pool)"""
+    return password_hasher.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify password (in the password_hasher pool)"""
+    return password_hasher.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create access token"""
@@ -48,6 +60,80 @@ def create_refresh_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def issue_refresh_token(db: Session, user_id: int, username: str, family_id: Optional[str] = None) -> str:
+    """Create and record a refresh token (new family at login, same family on rotation)
+
+    The row is added to db; the caller commits.
+    """
+    jti = secrets.token_urlsafe(24)
+    family_id = family_id or secrets.token_urlsafe(24)
+    db.add(RefreshToken(
+        jti=jti,
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return create_refresh_token(data={"sub": username, "jti": jti, "fam": family_id})
+
+def rotate_refresh_token(db: Session, refresh_token: str):
+    """Exchange a refresh token for a new one of the same family; returns (username, new token)
+
+    Each refresh token is accepted once. Presenting one that was already
+    exchanged means it was copied (or replayed): the whole family is revoked,
+    so both the thief and the legitimate client must log in again.
+    """
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token non valido o scaduto",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise invalid
+    jti = payload.get("jti")
+    if payload.get("type") != "refresh" or not jti:
+        raise invalid
+
+    now = datetime.utcnow()
+    # Compare-and-set: of two concurrent exchanges of the same token only one wins
+    claimed = db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == jti, RefreshToken.used_at.is_(None),
+               RefreshToken.revoked == False, RefreshToken.expires_at > now)
+        .values(used_at=now)
+    ).rowcount
+    token = db.query(RefreshToken.family_id, RefreshToken.user_id, RefreshToken.used_at).filter(
+        RefreshToken.jti == jti
+    ).first()
+    if token is None:
+        db.rollback()
+        raise invalid
+    if not claimed:
+        if token.used_at is not None:
+            print(f"[AUTH] Riutilizzo refresh token rilevato (user_id={token.user_id}): famiglia revocata")
+            db.execute(update(RefreshToken).where(RefreshToken.family_id == token.family_id).values(revoked=True))
+            db.commit()
+        else:
+            db.rollback()
+        raise invalid
+
+    user = db.query(User.username, User.is_active).filter(User.id == token.user_id).first()
+    if user is None or not user.is_active:
+        db.rollback()
+        raise invalid
+    new_token = issue_refresh_token(db, token.user_id, user.username, family_id=token.family_id)
+    db.commit()
+    return user.username, new_token
+
+def purge_expired_refresh_tokens(db: Session) -> int:
+    """Delete refresh token rows past their expiry"""
+    deleted = db.query(RefreshToken).filter(RefreshToken.expires_at <= datetime.utcnow()).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    return deleted
+
 def get_user_by_username_or_email(db: Session, username_or_email: str):
     """Get user by username OR email (supporta entrambi)"""
     return db.query(User).filter(
@@ -59,13 +145,16 @@ def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
 def authenticate_user(db: Session, username_or_email: str, password: str):
-    """Authenticate user - SUPPORTA LOGIN CON USERNAME O EMAIL + DEBUG"""
+    """Authenticate user - SUPPORTA LOGIN CON USERNAME O EMAIL + DEBUG
+
+    Returns the user, None if no user matches, False if the password is wrong.
+    """
     print(f"[AUTH] Tentativo login per: {username_or_email}")
     
     user = get_user_by_username_or_email(db, username_or_email)
     if not user:
         print(f"[AUTH] Utente NON trovato: {username_or_email}")
-        return False
+        return None
     
     print(f"[AUTH] Utente trovato - ID: {user.id}, Username: {user.username}, Email: {user.email}")
     print(f"[AUTH] Hash salvato: {user.hashed_password[:20]}...")
@@ -77,8 +166,93 @@ def authenticate_user(db: Session, username_or_email: str, password: str):
     print(f"[AUTH] Login RIUSCITO per {user.username}")
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get current user from token"""
+@dataclass(frozen=True)
+class AuthUser:
+    """Lightweight authenticated user returned by get_current_user (not an ORM object)"""
+    id: int
+    username: str
+    is_active: bool
+    is_admin: bool
+
+
+class AuthUserCache:
+    """Bounded LRU cache with TTL from token subject (username) to AuthUser
+
+    Entries are invalidated when a User row is updated or deleted through the
+    ORM (see the listeners below); the TTL bounds staleness for changes made
+    elsewhere (bulk UPDATE, other processes).
+    """
+
+    def __init__(self, ttl=60.0, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # username -> (AuthUser, expires_at monotonic)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[username]
+            self.misses += 1
+            return None
+
+    def put(self, user):
+        with self._lock:
+            self._entries[user.username] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user_id(self, user_id):
+        with self._lock:
+            stale = [username for username, (user, _) in self._entries.items() if user.id == user_id]
+            for username in stale:
+                del self._entries[username]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations
+        }
+
+
+auth_user_cache = AuthUserCache(ttl=AUTH_USER_CACHE_TTL_SECONDS, max_size=AUTH_USER_CACHE_SIZE)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    """Deactivation, role or username changes take effect on the next request"""
+    auth_user_cache.invalidate_user_id(target.id)
+
+
+def user_from_token(token: str, db: Optional[Session] = None) -> AuthUser:
+    """AuthUser for an access token (cached, database on miss)
+
+    db is only queried on a cache miss; without one a private session is opened.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -94,17 +268,35 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
 
-    # Get database session
-    db = SessionLocal()
+    user = auth_user_cache.get(username)
+    if user is not None:
+        return user
+
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
     try:
-        user = get_user_by_username(db, username=username)
-        if user is None:
+        row = db.query(User.id, User.username, User.is_active, User.is_admin).filter(
+            User.username == username
+        ).first()
+        if row is None:
             raise credentials_exception
-        return user
+        user = AuthUser(id=row.id, username=row.username, is_active=bool(row.is_active), is_admin=bool(row.is_admin))
     finally:
-        db.close()
+        if own_session:
+            db.close()
+    auth_user_cache.put(user)
+    return user
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_database)):
+    """Get current user from token
+
+    Uses the request-scoped session of get_database (main.get_db), so auth and
+    the handler share one session and at most one pooled connection per request.
+    """
+    return user_from_token(token, db)
 
-def get_current_active_user(current_user: User = Depends(get_current_user)):
+def get_current_active_user(current_user: AuthUser = Depends(get_current_user)):
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
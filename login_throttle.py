@@ -0,0 +1,150 @@
+"""
+Login throttling ahead of the database and bcrypt
+
+Every /token attempt used to cost a user lookup plus a bcrypt verify (~0.3 s
+of CPU), so credential stuffing was expensive to reject. LoginThrottle is
+checked first, in memory:
+
+- a token bucket per client IP caps the attempt rate, and one per
+  (client IP, identifier) - username/email, case-insensitive - caps failed
+  logins; an empty bucket is answered 429 with Retry-After and no further
+  work. Successful logins never spend the identifier bucket, and keying it
+  by IP means nobody can lock a user out by failing logins on their name;
+- identifiers that matched no user are remembered for a short TTL, so
+  repeated attempts on non-existent accounts are answered 401 without a query.
+  Registration forgets the new username/email at once.
+
+Buckets refill continuously, so a legitimate user logging in now and then
+never notices them. State is per process and bounded (LRU).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets: `capacity` attempts in a burst, `refill_per_second` sustained"""
+
+    def __init__(self, capacity, refill_per_second, max_keys=100000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, updated monotonic)
+        self.allowed = 0
+        self.rejected = 0
+
+    def take(self, key):
+        """Consume one token; returns 0 if allowed, else seconds until the next token"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                self._buckets.move_to_end(key)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                self.allowed += 1
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            self.rejected += 1
+            return (1 - tokens) / self.refill_per_second
+
+    def peek(self, key):
+        """Like take() without consuming: 0 if a token is available, else seconds until one"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return 0.0
+            tokens = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_per_second)
+            if tokens >= 1:
+                return 0.0
+            self.rejected += 1
+            return (1 - tokens) / self.refill_per_second
+
+    def stats(self):
+        with self._lock:
+            keys = len(self._buckets)
+        return {
+            "capacity": self.capacity,
+            "refill_per_second": self.refill_per_second,
+            "keys": keys,
+            "allowed": self.allowed,
+            "rejected": self.rejected
+        }
+
+
+class NegativeCache:
+    """Bounded TTL set of keys known to be missing"""
+
+    def __init__(self, ttl=60.0, max_size=100000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> expires_at monotonic
+        self.hits = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False
+            self.hits += 1
+            return True
+
+    def add(self, key):
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {"size": size, "ttl_seconds": self.ttl, "hits": self.hits}
+
+
+class LoginThrottle:
+    """Per-IP attempt limit, per-(IP, identifier) failure limit and the unknown identifier cache"""
+
+    def __init__(self, ip_capacity=20, ip_refill_per_minute=10, identifier_capacity=5,
+                 identifier_refill_per_minute=2, unknown_ttl=60.0):
+        self.by_ip = TokenBucketLimiter(ip_capacity, ip_refill_per_minute / 60.0)
+        self.by_identifier = TokenBucketLimiter(identifier_capacity, identifier_refill_per_minute / 60.0)
+        self.unknown = NegativeCache(ttl=unknown_ttl)
+
+    def check(self, client_ip, identifier):
+        """0 if the attempt may proceed, else seconds the client should wait"""
+        retry_after = self.by_ip.take(client_ip)
+        if retry_after:
+            return retry_after
+        return self.by_identifier.peek((client_ip, identifier.strip().lower()))
+
+    def record_failure(self, client_ip, identifier):
+        """Spend a token of the (IP, identifier) bucket after a failed login"""
+        self.by_identifier.take((client_ip, identifier.strip().lower()))
+
+    def forget_unknown(self, *identifiers):
+        """Called when accounts are created with these identifiers"""
+        for identifier in identifiers:
+            if identifier:
+                self.unknown.discard(identifier)
+
+    def stats(self):
+        return {
+            "by_ip": self.by_ip.stats(),
+            "by_identifier": self.by_identifier.stats(),
+            "unknown_identifiers": self.unknown.stats()
+        }
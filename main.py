@@ -1,43 +1,85 @@
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Request, Response
+from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy import insert, update, select, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from pydantic import ValidationError
 from datetime import datetime, timedelta
 from typing import List, Optional
-import httpx
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import hashlib
+import json
 # Railway deployment restart
 import os
+import time
 
 # Import our modules
-from database import SessionLocal, engine, check_database_health
+from database import SessionLocal, engine, check_database_health, get_database
 from models import Base, User, Signal, Subscription, MT5Connection, SignalExecution, VPSHeartbeat, SignalStatusEnum
 from schemas import (
-    UserCreate, UserResponse, Token, SignalCreate, SignalOut,
+    UserCreate, UserResponse, Token, RefreshTokenRequest, SignalCreate,
     SignalResponse, TopSignalsResponse, MT5ConnectionCreate, MT5ConnectionOut,
-    SignalExecutionCreate, SignalExecutionOut, SignalFilter, UserStatsOut,
-    VPSHeartbeatCreate, VPSSignalReceive, HealthCheckResponse, APIResponse
+    SignalExecutionCreate, SignalExecutionOut, SignalFilter, SignalPage, UserStatsOut,
+    VPSHeartbeatCreate, VPSSignalReceive, VPSSignalBatchReceive, HealthCheckResponse, APIResponse
 )
 from jwt_auth import (
-    authenticate_user, create_access_token, create_refresh_token,
-    get_current_user, get_current_active_user, hash_password,
-    ACCESS_TOKEN_EXPIRE_MINUTES
+    authenticate_user, create_access_token, issue_refresh_token, rotate_refresh_token,
+    purge_expired_refresh_tokens,
+    get_current_user, get_current_active_user, user_from_token, hash_password,
+    ACCESS_TOKEN_EXPIRE_MINUTES, AuthUser, auth_user_cache, password_hasher
 )
+from password_pool import PasswordHasherBusy
 # IMPORT AGGIUNTO PER EMAIL
 from email_utils import send_registration_email
+from ingest_journal import IngestJournal
+from mt5_bridge import BridgePool
+from quotes import QuoteFeed, QuoteSnapshot, TickHistory, vps_signals_to_quotes
+from instruments import InstrumentRegistry
+from signal_cache import LiveSignalCache, analysis_preview, entry_from_row, entry_from_values, signal_list_columns
+from realtime import SignalStreamBroker, WebSocketHub, format_sse
+from compression import CompressionMiddleware
+from login_throttle import LoginThrottle
+from migrations import run_migrations, run_online_migrations, idempotency_index_ready
 # SIGNAL ENGINE NON DISPONIBILE SU RAILWAY (solo su VPS Windows)
 # from signal_engine import get_signal_engine
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start/stop background services"""
+    run_online_migrations(engine)
+    live_signal_cache.load(SessionLocal)
+    password_hasher.start()
+    init_signal_stream()
+    if ingest_journal:
+        ingest_journal.start()
+    expiry_sweeper = asyncio.create_task(run_expiry_sweeper())
+    quote_poller = asyncio.create_task(run_quote_poller())
+    yield
+    quote_poller.cancel()
+    expiry_sweeper.cancel()
+    await bridge_pool.aclose()
+    password_hasher.stop()
+    if ingest_journal:
+        ingest_journal.stop()
 
 # FastAPI app
 app = FastAPI(
     title="Trading Signals API",
     description="Professional Trading Signals Platform with AI and MT5 Integration",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware - Allow specific domains with credentials
@@ -56,16 +98,94 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# brotli/gzip for JSON bodies above COMPRESSION_MIN_SIZE bytes (streams are not compressed)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # MT5 Bridge Configuration
 MT5_BRIDGE_URL = os.getenv("BRIDGE_BASE_URL", "http://154.61.187.189:8001")
+# One bridge per VPS: comma-separated list, defaults to BRIDGE_BASE_URL alone
+MT5_BRIDGE_URLS = [url.strip() for url in os.getenv("BRIDGE_BASE_URLS", MT5_BRIDGE_URL).split(",") if url.strip()]
+MT5_BRIDGE_URL = MT5_BRIDGE_URLS[0]
 MT5_BRIDGE_API_KEY = os.getenv("BRIDGE_API_KEY", "default-bridge-key")
 
+# Shared keep-alive clients for all bridge calls, routed to the fastest healthy bridge
+# (pool size, timeouts, circuit breaker and hedging from env)
+bridge_pool = BridgePool(
+    MT5_BRIDGE_URLS,
+    hedge=os.getenv("BRIDGE_HEDGE", "false").lower() == "true",
+    hedge_min_delay=int(os.getenv("BRIDGE_HEDGE_MIN_DELAY_MS", "50")) / 1000,
+    max_connections=int(os.getenv("BRIDGE_MAX_CONNECTIONS", "20")),
+    max_keepalive=int(os.getenv("BRIDGE_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.getenv("BRIDGE_KEEPALIVE_EXPIRY", "30")),
+    timeout=float(os.getenv("BRIDGE_TIMEOUT", "10")),
+    connect_timeout=float(os.getenv("BRIDGE_CONNECT_TIMEOUT", "5")),
+    breaker_failures=int(os.getenv("BRIDGE_BREAKER_FAILURES", "5")),
+    breaker_cooldown=float(os.getenv("BRIDGE_BREAKER_COOLDOWN", "30"))
+)
+
+# Instruments quoted from the bridge (pip size, digits, spread); INSTRUMENTS_FILE adds/overrides entries
+instrument_registry = InstrumentRegistry()
+if os.getenv("INSTRUMENTS_FILE"):
+    instrument_registry.load_file(os.getenv("INSTRUMENTS_FILE"))
+
+# Background quote poller: one bridge request per interval, handlers read the snapshot
+QUOTE_POLL_INTERVAL_SECONDS = float(os.getenv("QUOTE_POLL_INTERVAL_SECONDS", "2"))
+quote_feed = QuoteFeed(poll_interval=QUOTE_POLL_INTERVAL_SECONDS)
+
+# Per-symbol tick history for charts: QUOTE_HISTORY_SIZE ticks (24 bytes each) per symbol
+QUOTE_HISTORY_SIZE = int(os.getenv("QUOTE_HISTORY_SIZE", "3600"))
+QUOTE_HISTORY_MAX_SYMBOLS = int(os.getenv("QUOTE_HISTORY_MAX_SYMBOLS", "500"))
+quote_history = TickHistory(capacity=QUOTE_HISTORY_SIZE, max_symbols=QUOTE_HISTORY_MAX_SYMBOLS)
+
+# /token throttling ahead of DB/bcrypt: bursts and refills per minute, attempts per client IP
+# and failed logins per (client IP, username/email); unknown identifiers answered from memory for LOGIN_UNKNOWN_TTL_SECONDS.
+# LOGIN_THROTTLE_PROXY_HOPS: reverse proxies in front of the app (client IP from X-Forwarded-For);
+# defaults to 1 on Railway, where every request arrives through its edge proxy
+LOGIN_THROTTLE_PROXY_HOPS = int(os.getenv("LOGIN_THROTTLE_PROXY_HOPS", "1" if os.getenv("RAILWAY_ENVIRONMENT") else "0"))
+forwarded_header_warned = False
+login_throttle = LoginThrottle(
+    ip_capacity=int(os.getenv("LOGIN_IP_BURST", "20")),
+    ip_refill_per_minute=float(os.getenv("LOGIN_IP_PER_MINUTE", "10")),
+    identifier_capacity=int(os.getenv("LOGIN_IDENTIFIER_BURST", "5")),
+    identifier_refill_per_minute=float(os.getenv("LOGIN_IDENTIFIER_PER_MINUTE", "2")),
+    unknown_ttl=float(os.getenv("LOGIN_UNKNOWN_TTL_SECONDS", "60"))
+)
+
 # VPS API Key for authentication  
 VPS_API_KEY = os.getenv("VPS_API_KEY", os.getenv("MT5_SECRET_KEY", "default-vps-key"))
 
+# Ingest mode: "direct" commits every VPS push in the request,
+# "journal" appends to a local journal, acks and group-commits in background
+INGEST_MODE = os.getenv("INGEST_MODE", "direct").lower()
+INGEST_JOURNAL_PATH = os.getenv("INGEST_JOURNAL_PATH", "./ingest_journal.log")
+INGEST_FLUSH_INTERVAL_MS = int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "200"))
+INGEST_FLUSH_BATCH = int(os.getenv("INGEST_FLUSH_BATCH", "500"))
+
+# In-memory buffer of the newest active public signals (dashboard reads)
+LIVE_SIGNAL_CACHE_SIZE = int(os.getenv("LIVE_SIGNAL_CACHE_SIZE", "500"))
+live_signal_cache = LiveSignalCache(capacity=LIVE_SIGNAL_CACHE_SIZE)
+
+# Expiry sweeper: deactivates signals past expires_at in bounded batches
+SIGNAL_SWEEP_INTERVAL_SECONDS = int(os.getenv("SIGNAL_SWEEP_INTERVAL_SECONDS", "60"))
+SIGNAL_SWEEP_BATCH = int(os.getenv("SIGNAL_SWEEP_BATCH", "1000"))
+
+# Server-Sent Events stream of new VPS signals
+SIGNAL_STREAM_HISTORY = int(os.getenv("SIGNAL_STREAM_HISTORY", "1000"))
+SIGNAL_STREAM_QUEUE_SIZE = int(os.getenv("SIGNAL_STREAM_QUEUE_SIZE", "100"))
+SSE_KEEPALIVE_SECONDS = 15
+signal_stream = SignalStreamBroker(history_size=SIGNAL_STREAM_HISTORY, queue_size=SIGNAL_STREAM_QUEUE_SIZE)
+
+# WebSocket hub: per-symbol quotes/signals and per-VPS status topics
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "200"))
+WS_MAX_TOPICS = int(os.getenv("WS_MAX_TOPICS", "100"))
+ws_hub = WebSocketHub(queue_size=WS_QUEUE_SIZE, max_topics=WS_MAX_TOPICS)
+
 # Global MT5 connection status
 mt5_connection_active = False
 last_quotes_update = None
@@ -98,68 +218,110 @@ def safe_date_diff_days(end_date, start_date=None):
         print(f"Date calculation error: {e}")
         return 0
 
-# MT5 Bridge Helper Functions
-async def connect_to_vps_bridge():
-    """Test connection to VPS AI Trading Server"""
+def encode_signal_cursor(created_at: datetime, signal_id: int) -> str:
+    """Opaque keyset cursor for (created_at, id) pagination"""
+    raw = json.dumps({"c": created_at.isoformat(), "i": signal_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_signal_cursor(cursor: str):
+    """Inverse of encode_signal_cursor; raises ValueError on a malformed cursor"""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{MT5_BRIDGE_URL}/health")
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("status") == "healthy" or data.get("vps_running", False)
-    except Exception as e:
-        print(f"VPS Bridge connection error: {e}")
-        return False
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
 
-async def get_vps_quotes(symbols: List[str] = None):
-    """Fetch current quotes from VPS AI signals - converted to quote format"""
-    if not symbols:
-        symbols = ["EURUSD", "GBPUSD", "USDJPY", "USDCHF", "USDCAD", "AUDUSD", "NZDUSD"]
-    
-    quotes = {}
+def symbol_prefix_bounds(prefix: str):
+    """[lower, upper) range matching every symbol starting with prefix (index friendly, unlike ILIKE '%x%')"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+# MT5 Bridge Helper Functions
+async def get_vps_quotes():
+    """Fetch current quotes from VPS AI signals - converted to quote format (all symbols)"""
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(f"{MT5_BRIDGE_URL}/signals/latest")
-            
-            if response.status_code == 200:
-                data = response.json()
-                signals = data.get("signals", [])
-                
-                # Convert VPS signals to quote format
-                for signal in signals:
-                    symbol = signal.get("symbol", "").upper()
-                    if symbol in [s.upper() for s in symbols]:
-                        entry_price = signal.get("entry_price", 0)
-                        if entry_price > 0:
-                            spread = 0.0001 if "USD" in symbol else 0.00001
-                            quotes[symbol] = {
-                                "symbol": symbol,
-                                "bid": entry_price,
-                                "ask": entry_price + spread,
-                                "time": signal.get("timestamp", ""),
-                                "change": 0.0,
-                                "signal_type": signal.get("signal_type", ""),
-                                "reliability": signal.get("reliability", 0),
-                                "ai_explanation": signal.get("explanation", "")
-                            }
-                            
+        response = await bridge_pool.get("/signals/latest", timeout=15.0)
+        response.raise_for_status()
+        quotes = vps_signals_to_quotes(response.json().get("signals", []), instrument_registry)
+        return QuoteSnapshot.create(quotes)
     except Exception as e:
-        print(f"VPS quotes fetch error: {e}")
-    
-    return quotes
+        return QuoteSnapshot.create(error=str(e) or type(e).__name__)
 
-# Keep original function name for compatibility
-async def get_mt5_quotes(symbols: List[str] = None):
-    """Fetch quotes - now using VPS AI signals"""
-    return await get_vps_quotes(symbols)
+async def run_quote_poller():
+    """Background loop: poll the bridge every QUOTE_POLL_INTERVAL_SECONDS and publish a snapshot"""
+    global mt5_connection_active, last_quotes_update
+    while True:
+        started = time.monotonic()
+        try:
+            snapshot = await get_vps_quotes()
+            previous = quote_feed.publish(snapshot)
+            mt5_connection_active = snapshot.bridge_connected
+            if snapshot.bridge_connected:
+                last_quotes_update = snapshot.fetched_at
+            if snapshot.bridge_connected != previous.bridge_connected or (snapshot.error and not previous.error):
+                print(f"VPS quote poller: bridge {'connected' if snapshot.bridge_connected else 'unavailable'}"
+                      + (f" ({snapshot.error})" if snapshot.error else ""))
+            # Only quotes that changed since the previous poll go to WebSocket subscribers and history
+            polled_at = time.time()
+            for symbol, quote in snapshot.quotes.items():
+                if previous.quotes.get(symbol) != quote:
+                    quote_history.append(symbol, polled_at, quote["bid"], quote["ask"])
+                    ws_hub.publish(f"quotes:{symbol}", dict(quote), coalesce=True)
+        except Exception as e:
+            print(f"VPS quote poller error: {e}")
+        await asyncio.sleep(max(0.0, QUOTE_POLL_INTERVAL_SECONDS - (time.monotonic() - started)))
+
+def quotes_response(symbols: List[str], since: Optional[int] = None):
+    """Response body shared by the quote endpoints, read from the current snapshot
+
+    With since=<version> only the quotes changed after that version are returned,
+    or 304 Not Modified if none of the requested symbols changed.
+    """
+    snapshot = quote_feed.snapshot
+    age = snapshot.age()
+    cache_age = round(age, 3) if age is not None else None
+    if not snapshot.bridge_connected:
+        return {
+            "status": "error",
+            "message": "MT5 Bridge non disponibile",
+            "bridge_url": MT5_BRIDGE_URL,
+            "quotes": {},
+            "version": snapshot.version,
+            "cache_age_seconds": cache_age
+        }
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    body = {
+        "status": "success",
+        "message": "Quotazioni aggiornate",
+        "bridge_connected": True,
+        "last_update": snapshot.fetched_at,
+        "version": snapshot.version,
+        "cache_age_seconds": cache_age
+    }
+    # A version outside this process' range (before a restart) gets the full map
+    if since is not None and quote_feed.base_version <= since <= snapshot.version:
+        quotes, removed = snapshot.changes_since(since, symbols)
+        if not quotes and not removed:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"X-Quotes-Version": str(snapshot.version)})
+        body.update(delta=True, since=since, quotes=quotes, removed=removed)
+        return orjson_response(body)
+
+    body.update(delta=False, quotes=snapshot.select(symbols))
+    return orjson_response(body)
+
+# Dependency: the same function as jwt_auth's, so FastAPI resolves it once per request
+# and auth and the handler share one lazily connected session
+get_db = get_database
+
+def orjson_response(content, response: Optional[Response] = None):
+    """JSON response encoded by orjson directly, skipping FastAPI's jsonable_encoder pass
+
+    Headers already set on the injected response (e.g. ETag) are kept.
+    """
+    headers = None
+    if response is not None:
+        headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return ORJSONResponse(content, headers=headers)
 
 # VPS API Key verification
 def verify_vps_api_key(request: Request):
@@ -264,15 +426,17 @@ def test_deployment_status():
 async def test_vps_connection():
     """Test connection to VPS AI Trading Server"""
     try:
-        bridge_status = await connect_to_vps_bridge()
-        quotes_test = await get_vps_quotes(["EURUSD"])
+        snapshot = quote_feed.snapshot
+        quotes_test = snapshot.select(["EURUSD"])
         
         return {
-            "mt5_bridge_connected": bridge_status,
+            "mt5_bridge_connected": snapshot.bridge_connected,
             "bridge_url": MT5_BRIDGE_URL,
             "api_key_configured": bool(MT5_BRIDGE_API_KEY != "default-bridge-key"),
             "quotes_available": len(quotes_test) > 0,
             "sample_quotes": quotes_test,
+            "last_error": snapshot.error,
+            "snapshot_at": snapshot.fetched_at,
             "timestamp": datetime.utcnow()
         }
     except Exception as e:
@@ -283,6 +447,60 @@ async def test_vps_connection():
             "timestamp": datetime.utcnow()
         }
 
+@app.get("/debug/ingest")
+def debug_ingest_status():
+    """Ingest mode and write-behind journal statistics"""
+    return {
+        "ingest_mode": INGEST_MODE,
+        "journal": ingest_journal.stats() if ingest_journal else None,
+        "timestamp": datetime.utcnow()
+    }
+
+@app.get("/debug/signal-cache")
+def debug_signal_cache():
+    """Live signal cache size and hit/miss counters"""
+    return {
+        "live_signal_cache": live_signal_cache.stats(),
+        "timestamp": datetime.utcnow()
+    }
+
+@app.get("/debug/quotes")
+async def debug_quotes():
+    """Background quote poller, current snapshot and tick history status"""
+    return {
+        "quote_feed": quote_feed.stats(),
+        "quote_history": quote_history.stats(),
+        "timestamp": datetime.utcnow()
+    }
+
+@app.get("/debug/auth-cache")
+def debug_auth_cache():
+    """Authenticated user cache size and hit/miss counters, bcrypt pool load"""
+    return {
+        "auth_user_cache": auth_user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "login_throttle": login_throttle.stats(),
+        "timestamp": datetime.utcnow()
+    }
+
+@app.get("/debug/realtime")
+def debug_realtime():
+    """SSE stream and WebSocket hub statistics"""
+    return {
+        "signal_stream": signal_stream.stats(),
+        "websocket_hub": ws_hub.stats(),
+        "timestamp": datetime.utcnow()
+    }
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """Too many logins/registrations in flight: fail fast, the client retries"""
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Troppe richieste di autenticazione, riprova tra poco"},
+        headers={"Retry-After": "1"}
+    )
+
 # ========== AUTHENTICATION ENDPOINTS ==========
 
 @app.post("/register", status_code=status.HTTP_201_CREATED)
@@ -315,6 +533,7 @@ def register_user(user: UserCreate, background_tasks: BackgroundTasks, db: Sessi
         db.add(subscription)
         db.commit()
         db.refresh(db_user)
+        login_throttle.forget_unknown(db_user.username, db_user.email)
 
         print(f"Utente creato con ID: {db_user.id}")
 
@@ -354,6 +573,9 @@ def register_user(user: UserCreate, background_tasks: BackgroundTasks, db: Sessi
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Errore durante la registrazione"
             )
+    except PasswordHasherBusy:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         print(f"Errore generico registrazione: {e}")
@@ -362,22 +584,55 @@ def register_user(user: UserCreate, background_tasks: BackgroundTasks, db: Sessi
             detail="Errore interno del server"
         )
 
+def client_ip(request: Request) -> str:
+    """Client address; behind LOGIN_THROTTLE_PROXY_HOPS proxies, taken from X-Forwarded-For"""
+    global forwarded_header_warned
+    if LOGIN_THROTTLE_PROXY_HOPS:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if len(forwarded) >= LOGIN_THROTTLE_PROXY_HOPS:
+            return forwarded[-LOGIN_THROTTLE_PROXY_HOPS]
+    elif "x-forwarded-for" in request.headers and not forwarded_header_warned:
+        # Behind a proxy every client shares the proxy address, and so one login throttle bucket
+        forwarded_header_warned = True
+        print("Login throttle warning: X-Forwarded-For received but LOGIN_THROTTLE_PROXY_HOPS=0: login throttling keys on the proxy IP, set it to the number of proxies")
+    return request.client.host if request.client else "unknown"
+
 @app.post("/token", response_model=Token)
-def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    """Login user and return JWT tokens - SUPPORTA USERNAME E EMAIL"""
+def login_user(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    """Login user and return JWT tokens - SUPPORTA USERNAME E EMAIL
+
+    Throttled per IP and, for failed logins, per (IP, identifier); unknown
+    identifiers are answered from memory, before any query or bcrypt work.
+    """
+    login_failed = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Username o password incorretti",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    ip = client_ip(request)
+    retry_after = login_throttle.check(ip, form_data.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Troppi tentativi di login, riprova più tardi",
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+    if form_data.username in login_throttle.unknown:
+        raise login_failed
+
     print(f"Tentativo login da frontend per: {form_data.username}")
     
     user = authenticate_user(db, form_data.username, form_data.password)
     if not user:
         print(f"Login FALLITO per: {form_data.username}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Username o password incorretti",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        login_throttle.record_failure(ip, form_data.username)
+        if user is None:
+            login_throttle.unknown.add(form_data.username)
+        raise login_failed
 
     # Update last login
     user.last_login = datetime.utcnow()
+    refresh_token = issue_refresh_token(db, user.id, user.username)
     db.commit()
     print(f"Login riuscito per: {user.username}")
 
@@ -386,7 +641,6 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    refresh_token = create_refresh_token(data={"sub": user.username})
     
     return {
         "access_token": access_token,
@@ -395,6 +649,24 @@ def login_user(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = D
         "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
     }
 
+@app.post("/token/refresh", response_model=Token)
+def refresh_tokens(body: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """New access token and rotated refresh token for a valid refresh token (no password/bcrypt)
+
+    A refresh token works once: reusing an exchanged one revokes its whole
+    family and the client has to log in again.
+    """
+    username, refresh_token = rotate_refresh_token(db, body.refresh_token)
+    access_token = create_access_token(
+        data={"sub": username}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
 @app.get("/api/landing/stats")
 def get_landing_page_stats(db: Session = Depends(get_db)):
     """Get aggregated statistics for landing page display"""
@@ -474,7 +746,7 @@ def get_recent_signals_preview(db: Session = Depends(get_db)):
         return {"signals": []}
 
 @app.get("/me", response_model=UserStatsOut)
-def get_current_user_info(response: Response, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def get_current_user_info(response: Response, current_user: AuthUser = Depends(get_current_active_user), db: Session = Depends(get_db)):
     """Get current user information with statistics"""
     # Add explicit CORS headers
     response.headers["Access-Control-Allow-Origin"] = "*"
@@ -530,14 +802,38 @@ def get_current_user_info(response: Response, current_user: User = Depends(get_c
 
 # ========== SIGNAL ENDPOINTS ==========
 
+def signal_etag(*parts, marker=None):
+    """Weak ETag from the live signal cache marker plus request variant, None before the cache is loaded"""
+    marker = marker or live_signal_cache.marker()
+    if marker is None:
+        return None
+    return 'W/"' + "-".join(str(part) for part in (*marker, *parts)) + '"'
+
+def not_modified(request: Request, response: Response, etag: Optional[str]):
+    """304 response if If-None-Match matches etag; otherwise tag the response being built"""
+    if etag is None:
+        return None
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
 @app.get("/signals/top", response_model=TopSignalsResponse)
-def get_top_signals(db: Session = Depends(get_db)):
+def get_top_signals(request: Request, response: Response, db: Session = Depends(get_db)):
     """Get top 3 public signals with highest reliability"""
-    top_signals = db.query(Signal).filter(
-        Signal.is_public == True,
-        Signal.is_active == True,
-        Signal.reliability >= 70.0
-    ).order_by(Signal.reliability.desc()).limit(3).all()
+    cached = not_modified(request, response, signal_etag("top"))
+    if cached:
+        return cached
+
+    top_signals = live_signal_cache.top(3, min_reliability=70.0)
+    if top_signals is None:
+        top_signals = [entry_from_row(signal) for signal in db.query(*signal_list_columns()).filter(
+            Signal.is_public == True,
+            Signal.is_active == True,
+            Signal.reliability >= 70.0
+        ).order_by(Signal.reliability.desc()).limit(3).all()]
 
     return TopSignalsResponse(
         signals=top_signals,
@@ -545,48 +841,72 @@ def get_top_signals(db: Session = Depends(get_db)):
         generated_at=datetime.utcnow()
     )
 
-@app.get("/signals", response_model=List[SignalOut])
+@app.get("/signals", response_model=SignalPage)
 def get_user_signals(
     filter_params: SignalFilter = Depends(),
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get user signals with filtering"""
-    query = db.query(Signal).filter(Signal.creator_id == current_user.id)
+    """
+    Get user signals with filtering, newest first
+    
+    Keyset pagination on (created_at, id): pass the returned next_cursor as
+    ?cursor= to get the next page. Every page costs the same as the first one.
+    """
+    # List columns only: ai_analysis is truncated by the DB (full text via /api/signals/{id}/analysis)
+    query = db.query(*signal_list_columns()).filter(Signal.creator_id == current_user.id)
 
     # Apply filters
-    if filter_params.asset:
-        query = query.filter(Signal.asset.ilike(f"%{filter_params.asset}%"))
+    if filter_params.symbol:
+        symbol = filter_params.symbol.strip().upper()
+        if symbol.endswith("*") and len(symbol) > 1:
+            lower, upper = symbol_prefix_bounds(symbol[:-1])
+            query = query.filter(Signal.symbol >= lower, Signal.symbol < upper)
+        else:
+            query = query.filter(Signal.symbol == symbol)
     if filter_params.signal_type:
-        query = query.filter(Signal.signal_type == filter_params.signal_type)
-    if filter_params.min_reliability is not None:
+        query = query.filter(Signal.signal_type == filter_params.signal_type.value)
+    if filter_params.min_reliability:
         query = query.filter(Signal.reliability >= filter_params.min_reliability)
     if filter_params.max_reliability is not None:
         query = query.filter(Signal.reliability <= filter_params.max_reliability)
-    if filter_params.outcome:
-        # Map outcome to status (simplified mapping)
-        if filter_params.outcome == "WIN":
-            query = query.filter(Signal.status == SignalStatusEnum.CLOSED)
-        elif filter_params.outcome == "LOSS":
-            query = query.filter(Signal.status == SignalStatusEnum.CLOSED)
-        else:
-            query = query.filter(Signal.status == SignalStatusEnum[filter_params.outcome])
-    if filter_params.is_active is not None:
-        query = query.filter(Signal.is_active == filter_params.is_active)
+    if filter_params.status:
+        query = query.filter(Signal.status == SignalStatusEnum[filter_params.status.value])
+    if filter_params.only_active:
+        query = query.filter(Signal.is_active == True)
     if filter_params.date_from:
         query = query.filter(Signal.created_at >= filter_params.date_from)
     if filter_params.date_to:
         query = query.filter(Signal.created_at <= filter_params.date_to)
 
-    # Apply pagination
-    signals = query.offset(filter_params.offset).limit(filter_params.limit).all()
-    return signals
+    # Keyset pagination: continue strictly after the last row of the previous page
+    if filter_params.cursor:
+        try:
+            cursor_created_at, cursor_id = decode_signal_cursor(filter_params.cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor non valido"
+            )
+        query = query.filter(tuple_(Signal.created_at, Signal.id) < tuple_(cursor_created_at, cursor_id))
+
+    # One extra row tells whether there is a next page
+    signals = query.order_by(Signal.created_at.desc(), Signal.id.desc()).limit(filter_params.limit + 1).all()
+    has_more = len(signals) > filter_params.limit
+    signals = signals[:filter_params.limit]
+    next_cursor = encode_signal_cursor(signals[-1].created_at, signals[-1].id) if has_more else None
+
+    return SignalPage(
+        signals=[{**signal._mapping, "ai_analysis": analysis_preview(signal.ai_analysis)} for signal in signals],
+        count=len(signals),
+        next_cursor=next_cursor
+    )
 
 @app.post("/signals", response_model=SignalResponse, status_code=status.HTTP_201_CREATED)
 def create_signal(
     signal_data: SignalCreate,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Create a new trading signal (admin only for now)"""
@@ -634,7 +954,7 @@ def create_signal(
 @app.post("/mt5/connect", response_model=dict)
 def setup_mt5_connection(
     connection_data: MT5ConnectionCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Setup or update MT5 connection for user"""
@@ -677,7 +997,7 @@ def setup_mt5_connection(
 
 @app.get("/mt5/status", response_model=MT5ConnectionOut)
 def get_mt5_connection_status(
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get MT5 connection status for current user"""
@@ -696,105 +1016,87 @@ def get_mt5_connection_status(
 @app.get("/mt5/quotes")
 async def get_live_quotes(
     symbols: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user)
+    since: Optional[int] = None,
+    current_user: AuthUser = Depends(get_current_active_user)
 ):
-    """Get live MT5 quotes for specified symbols"""
-    global mt5_connection_active, last_quotes_update
-
+    """Get live MT5 quotes for specified symbols (since=<version>: only changed quotes)"""
     # Parse symbols parameter
     symbol_list = None
     if symbols:
-        symbol_list = [s.strip().upper() for s in symbols.split(",")]
+        symbol_list = [instrument_registry.normalize(s) for s in symbols.split(",") if s.strip()]
 
-    # Check MT5 Bridge connection
-    bridge_connected = await connect_to_vps_bridge()
-    mt5_connection_active = bridge_connected
-
-    if not bridge_connected:
-        return {
-            "status": "error",
-            "message": "MT5 Bridge non disponibile",
-            "bridge_url": MT5_BRIDGE_URL,
-            "quotes": {}
-        }
+    if not symbol_list:
+        symbol_list = ["EURUSD", "GBPUSD", "USDJPY", "USDCHF", "USDCAD", "AUDUSD", "NZDUSD"]
 
-    # Get live quotes
-    quotes = await get_mt5_quotes(symbol_list)
-    last_quotes_update = datetime.utcnow()
-
-    return {
-        "status": "success",
-        "message": "Quotazioni aggiornate",
-        "bridge_connected": True,
-        "last_update": last_quotes_update,
-        "quotes": quotes
-    }
+    return quotes_response(symbol_list, since)
 
 @app.get("/api/mt5/quotes-public")
-async def get_public_live_quotes(symbols: Optional[str] = None):
-    """Get live MT5 quotes for specified symbols - Public endpoint for dashboard"""
-    global mt5_connection_active, last_quotes_update
-
+async def get_public_live_quotes(symbols: Optional[str] = None, since: Optional[int] = None):
+    """Get live MT5 quotes for specified symbols - Public endpoint for dashboard (since=<version>: only changed quotes)"""
     # Parse symbols parameter
     symbol_list = None
     if symbols:
-        symbol_list = [s.strip().upper() for s in symbols.split(",")]
+        symbol_list = [instrument_registry.normalize(s) for s in symbols.split(",") if s.strip()]
     
     # Default symbols if none provided
     if not symbol_list:
         symbol_list = ["EURUSD", "GBPUSD", "USDJPY", "USDCHF", "AUDUSD"]
 
-    # Check MT5 Bridge connection
-    bridge_connected = await connect_to_vps_bridge()
-    mt5_connection_active = bridge_connected
+    return quotes_response(symbol_list, since)
 
-    if not bridge_connected:
-        return {
-            "status": "error",
-            "message": "MT5 Bridge non disponibile",
-            "bridge_url": MT5_BRIDGE_URL,
-            "quotes": {}
-        }
-
-    # Get live quotes
-    quotes = await get_mt5_quotes(symbol_list)
-    last_quotes_update = datetime.utcnow()
-
-    return {
+@app.get("/api/mt5/quotes/{symbol}/history")
+async def get_quote_history(symbol: str, minutes: int = 60, points: int = 120):
+    """Downsampled tick history of a symbol for sparklines: [time (epoch s), bid, ask] per point"""
+    if not 1 <= minutes <= 1440 or not 2 <= points <= 1000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="minutes deve essere tra 1 e 1440, points tra 2 e 1000"
+        )
+    symbol = instrument_registry.normalize(symbol)
+    history = quote_history.downsample(symbol, time.time() - minutes * 60, points)
+    if history is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Nessuno storico per questo simbolo"
+        )
+    return orjson_response({
         "status": "success",
-        "message": "Quotazioni aggiornate",
-        "bridge_connected": True,
-        "last_update": last_quotes_update,
-        "quotes": quotes
-    }
+        "symbol": symbol,
+        "minutes": minutes,
+        "points": history,
+        "count": len(history)
+    })
 
 @app.get("/mt5/bridge-status")
 async def check_bridge_status():
     """Check MT5 Bridge service status"""
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{MT5_BRIDGE_URL}/health")
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "status": "connected",
-                    "bridge_url": MT5_BRIDGE_URL,
-                    "mt5_initialized": data.get("mt5_initialized", False),
-                    "current_login": data.get("current_login"),
-                    "timestamp": data.get("timestamp")
-                }
+        response = await bridge_pool.get("/health", timeout=5.0)
+        if response.status_code == 200:
+            data = response.json()
+            return {
+                "status": "connected",
+                "bridge_url": MT5_BRIDGE_URL,
+                "mt5_initialized": data.get("mt5_initialized", False),
+                "current_login": data.get("current_login"),
+                "timestamp": data.get("timestamp"),
+                "bridges": bridge_pool.stats()
+            }
+        error = f"HTTP {response.status_code}"
     except Exception as e:
-        return {
-            "status": "disconnected",
-            "bridge_url": MT5_BRIDGE_URL,
-            "error": str(e)
-        }
+        error = str(e)
+    return {
+        "status": "disconnected",
+        "bridge_url": MT5_BRIDGE_URL,
+        "error": error,
+        "bridges": bridge_pool.stats()
+    }
 
 # ========== PAYMENT ENDPOINTS ==========
 
 @app.post("/api/payments/create-demo-payment")
 def create_demo_payment(
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Simulate payment processing for demo/development purposes"""
@@ -834,7 +1136,7 @@ def create_demo_payment(
 
 @app.get("/api/payments/subscription-status")
 def get_subscription_status(
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get current subscription status"""
@@ -865,7 +1167,7 @@ def get_subscription_status(
 
 @app.get("/download/ea")
 def download_expert_advisor(
-    current_user: User = Depends(get_current_active_user)
+    current_user: AuthUser = Depends(get_current_active_user)
 ):
     """Download AI Cash-Revolution Expert Advisor for MT5"""
     try:
@@ -894,7 +1196,7 @@ def download_expert_advisor(
 @app.post("/mt5/heartbeat")
 def receive_ea_heartbeat(
     heartbeat_data: dict,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Receive heartbeat from EA with account stats"""
@@ -921,7 +1223,7 @@ def receive_ea_heartbeat(
 
 @app.get("/mt5/pending-orders")
 def get_pending_orders(
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get pending orders for EA execution"""
@@ -973,7 +1275,7 @@ def get_pending_orders(
 @app.post("/mt5/order-execution")
 def confirm_order_execution(
     execution_data: dict,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Confirm order execution from EA"""
@@ -987,6 +1289,8 @@ def confirm_order_execution(
             signal.outcome = "WIN" if executed else "FAILED"
             signal.is_active = False if executed else True
             db.commit()
+            if not signal.is_active:
+                publish_deactivated_signals([(signal.id, signal.symbol)], reason="executed")
 
         print(f"Ordine {order_id} - Esecuzione: {executed}")
         return {
@@ -1006,7 +1310,7 @@ def confirm_order_execution(
 @app.post("/mt5/trade-confirmation")
 def receive_trade_confirmation(
     trade_data: dict,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Receive trade confirmation from EA"""
@@ -1049,7 +1353,7 @@ def receive_trade_confirmation(
 # SIGNAL GENERATION ENDPOINTS COMMENTATI - DISPONIBILI SOLO SU VPS
 # @app.post("/admin/generate-signals")
 # def generate_signals_manually(
-#     current_user: User = Depends(get_current_active_user),
+#     current_user: AuthUser = Depends(get_current_active_user),
 #     db: Session = Depends(get_db)
 # ):
 #     """Generate signals manually (admin only) - DISPONIBILE SOLO SU VPS"""
@@ -1059,8 +1363,12 @@ def receive_trade_confirmation(
 # (Railway serve solo interfaccia web e si connette alla VPS per i dati)
 
 @app.get("/api/generate-signals-if-needed")  
-def generate_signals_if_needed_info(db: Session = Depends(get_db)):
+def generate_signals_if_needed_info(request: Request, response: Response, db: Session = Depends(get_db)):
     """Info sui segnali - generazione disponibile solo su VPS"""
+    cached = not_modified(request, response, signal_etag("count"))
+    if cached:
+        return cached
+
     active_count = db.query(Signal).filter(
         Signal.is_active == True,
         Signal.is_public == True
@@ -1103,6 +1411,199 @@ def health_check(db: Session = Depends(get_db)):
         }
     )
 
+def signal_idempotency_key(signal_data: VPSSignalReceive) -> str:
+    """Client-supplied key, or a natural key derived from vps_id + symbol + signal_type + generated_at"""
+    if signal_data.idempotency_key:
+        return signal_data.idempotency_key
+    natural_key = "|".join([
+        signal_data.vps_id,
+        signal_data.signal.symbol.upper(),
+        signal_data.signal.signal_type.value,
+        signal_data.generated_at.isoformat()
+    ])
+    return hashlib.sha256(natural_key.encode("utf-8")).hexdigest()
+
+def signal_insert_ignore_duplicates():
+    """INSERT into signals that silently skips rows whose idempotency_key already exists"""
+    dialect_insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+    return dialect_insert(Signal).on_conflict_do_nothing(index_elements=["idempotency_key"])
+
+def insert_signals_ignore_duplicates(db: Session, rows: list) -> dict:
+    """Insert signal rows skipping known idempotency keys; returns {idempotency_key: id} of inserted rows"""
+    if idempotency_index_ready.is_set():
+        return {
+            row.idempotency_key: row.id
+            for row in db.execute(signal_insert_ignore_duplicates().returning(Signal.id, Signal.idempotency_key), rows)
+        }
+    # Unique index still being built online: ON CONFLICT cannot use it yet, dedupe by lookup
+    keys = {row["idempotency_key"] for row in rows}
+    existing = set(db.scalars(select(Signal.idempotency_key).where(Signal.idempotency_key.in_(keys))))
+    fresh = {}
+    for row in rows:
+        if row["idempotency_key"] not in existing:
+            fresh.setdefault(row["idempotency_key"], row)
+    if not fresh:
+        return {}
+    return {
+        row.idempotency_key: row.id
+        for row in db.execute(insert(Signal).returning(Signal.id, Signal.idempotency_key), list(fresh.values()))
+    }
+
+def vps_signal_values(signal_data: VPSSignalReceive) -> dict:
+    """Map a VPS signal push to Signal column values (shared by single and batch ingest)"""
+    return {
+        "symbol": signal_data.signal.symbol,
+        "signal_type": signal_data.signal.signal_type,
+        "entry_price": signal_data.signal.entry_price,
+        "stop_loss": signal_data.signal.stop_loss,
+        "take_profit": signal_data.signal.take_profit,
+        "reliability": signal_data.reliability or signal_data.signal.reliability or 0.0,
+        "ai_analysis": signal_data.ai_analysis or signal_data.signal.ai_analysis,
+        "confidence_score": signal_data.confidence_score or signal_data.signal.confidence_score or 0.0,
+        "risk_level": signal_data.signal.risk_level or "MEDIUM",
+        "vps_id": signal_data.vps_id,
+        "source": "VPS_AI",
+        "is_public": True,
+        "is_active": True,
+        "created_at": signal_data.generated_at,
+        "expires_at": signal_data.signal.expires_at,
+        "idempotency_key": signal_idempotency_key(signal_data)
+    }
+
+def vps_heartbeat_values(heartbeat_data: VPSHeartbeatCreate, received_at: datetime) -> dict:
+    """Map a VPS heartbeat push to VPSHeartbeat column values"""
+    return {
+        "vps_id": heartbeat_data.vps_id,
+        "status": heartbeat_data.status,
+        "signals_generated": heartbeat_data.signals_generated,
+        "errors_count": heartbeat_data.errors_count,
+        "uptime_seconds": heartbeat_data.uptime_seconds,
+        "version": heartbeat_data.version,
+        "mt5_status": heartbeat_data.mt5_status,
+        "timestamp": received_at
+    }
+
+def publish_new_signals(rows: list, signal_ids: dict):
+    """Make freshly committed signals visible to live readers; signal_ids maps idempotency_key -> id"""
+    # A batch may repeat an item: its rows share the idempotency key (and id), publish it once
+    entries = list({
+        row["idempotency_key"]: entry_from_values(row, signal_ids[row["idempotency_key"]])
+        for row in rows
+        if row["idempotency_key"] in signal_ids
+    }.values())
+    if entries:
+        live_signal_cache.add_many(entries)
+        for entry in sorted(entries, key=lambda entry: entry["id"]):
+            if entry["source"] == "VPS_AI":
+                event_data = signal_event_data(entry)
+                signal_stream.publish("signal", event_data, event_id=entry["id"])
+                ws_hub.publish(f"signals:{entry['symbol'].upper()}", event_data)
+
+def publish_deactivated_signals(signals: list, reason: str):
+    """Remove deactivated signals from live readers; signals is a list of (id, symbol)"""
+    if not signals:
+        return
+    live_signal_cache.discard([signal_id for signal_id, _ in signals])
+    signal_stream.publish("deactivated", {"ids": [signal_id for signal_id, _ in signals], "reason": reason})
+    for signal_id, symbol in signals:
+        ws_hub.publish(f"signals:{symbol.upper()}", {"event": "deactivated", "id": signal_id, "reason": reason})
+
+def sweep_expired_signals() -> int:
+    """Deactivate signals whose expires_at has passed, SIGNAL_SWEEP_BATCH rows per UPDATE"""
+    total = 0
+    while True:
+        now = datetime.utcnow()
+        expired_ids = select(Signal.id).where(
+            Signal.is_active == True,
+            Signal.expires_at <= now
+        ).limit(SIGNAL_SWEEP_BATCH).scalar_subquery()
+        
+        db = SessionLocal()
+        try:
+            expired = db.execute(
+                update(Signal)
+                .where(Signal.id.in_(expired_ids))
+                .values(is_active=False)
+                .returning(Signal.id, Signal.symbol)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        
+        publish_deactivated_signals([(row.id, row.symbol) for row in expired], reason="expired")
+        total += len(expired)
+        if len(expired) < SIGNAL_SWEEP_BATCH:
+            return total
+
+def purge_refresh_tokens() -> int:
+    db = SessionLocal()
+    try:
+        return purge_expired_refresh_tokens(db)
+    finally:
+        db.close()
+
+async def run_expiry_sweeper():
+    """Background loop: sweep expired signals (and refresh tokens) every SIGNAL_SWEEP_INTERVAL_SECONDS"""
+    while True:
+        try:
+            expired_count = await run_in_threadpool(sweep_expired_signals)
+            if expired_count:
+                print(f"Expiry sweeper: {expired_count} signals deactivated")
+            # Refill the live cache if expiries/deactivations left it short
+            await run_in_threadpool(live_signal_cache.refill, SessionLocal)
+            purged_count = await run_in_threadpool(purge_refresh_tokens)
+            if purged_count:
+                print(f"Expiry sweeper: {purged_count} expired refresh tokens deleted")
+        except Exception as e:
+            print(f"Expiry sweeper error: {e}")
+        await asyncio.sleep(SIGNAL_SWEEP_INTERVAL_SECONDS)
+
+def flush_ingest_journal_entries(entries: list):
+    """Group-commit a batch of journal entries: one bulk INSERT per table, one transaction"""
+    signal_rows = []
+    heartbeat_rows = []
+    for entry in entries:
+        if entry["kind"] == "signal":
+            signal_rows.append(vps_signal_values(VPSSignalReceive.model_validate(entry["payload"])))
+        elif entry["kind"] == "heartbeat":
+            heartbeat_rows.append(vps_heartbeat_values(
+                VPSHeartbeatCreate.model_validate(entry["payload"]),
+                datetime.fromisoformat(entry["received_at"])
+            ))
+    
+    db = SessionLocal()
+    try:
+        signal_ids = {}
+        if signal_rows:
+            # Replays after a crash may resend committed entries: duplicates are dropped by the DB
+            signal_ids = insert_signals_ignore_duplicates(db, signal_rows)
+        if heartbeat_rows:
+            db.execute(insert(VPSHeartbeat), heartbeat_rows)
+        db.commit()
+        publish_new_signals(signal_rows, signal_ids)
+        print(f"Ingest journal flush: {len(signal_rows)} signals, {len(heartbeat_rows)} heartbeats committed")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def ingest_entry_rejected(error: Exception) -> bool:
+    """Errors caused by an entry's content (dead-lettered), as opposed to DB unavailability (retried)"""
+    return isinstance(error, (DataError, IntegrityError, ValidationError, ValueError, KeyError, TypeError))
+
+ingest_journal = IngestJournal(
+    INGEST_JOURNAL_PATH,
+    flush_ingest_journal_entries,
+    flush_interval=INGEST_FLUSH_INTERVAL_MS / 1000,
+    max_batch=INGEST_FLUSH_BATCH,
+    is_permanent_error=ingest_entry_rejected
+) if INGEST_MODE == "journal" else None
+
 @app.post("/api/vps/heartbeat", response_model=APIResponse)
 def receive_vps_heartbeat(
     heartbeat_data: VPSHeartbeatCreate,
@@ -1124,17 +1625,27 @@ def receive_vps_heartbeat(
     - Enables Railway to know VPS is alive and working
     """
     try:
+        response_data = {
+            "vps_id": heartbeat_data.vps_id,
+            "signals_generated": heartbeat_data.signals_generated,
+            "uptime_seconds": heartbeat_data.uptime_seconds
+        }
+        ws_hub.publish(f"vps:{heartbeat_data.vps_id}", {
+            **heartbeat_data.model_dump(mode="json"),
+            "last_heartbeat": datetime.now().isoformat()
+        }, coalesce=True)
+        
+        if ingest_journal:
+            # Write-behind: durable in the journal, committed to DB by the background writer
+            response_data["journal_seq"] = ingest_journal.append("heartbeat", heartbeat_data.model_dump(mode="json"))
+            return APIResponse(
+                status="accepted",
+                message=f"Heartbeat accepted from VPS {heartbeat_data.vps_id}",
+                data=response_data
+            )
+        
         # Create or update VPS heartbeat record
-        heartbeat = VPSHeartbeat(
-            vps_id=heartbeat_data.vps_id,
-            status=heartbeat_data.status,
-            signals_generated=heartbeat_data.signals_generated,
-            errors_count=heartbeat_data.errors_count,
-            uptime_seconds=heartbeat_data.uptime_seconds,
-            version=heartbeat_data.version,
-            mt5_status=heartbeat_data.mt5_status,
-            timestamp=datetime.now()
-        )
+        heartbeat = VPSHeartbeat(**vps_heartbeat_values(heartbeat_data, datetime.now()))
         
         db.add(heartbeat)
         db.commit()
@@ -1144,11 +1655,7 @@ def receive_vps_heartbeat(
         return APIResponse(
             status="success",
             message=f"Heartbeat received from VPS {heartbeat_data.vps_id}",
-            data={
-                "vps_id": heartbeat_data.vps_id,
-                "signals_generated": heartbeat_data.signals_generated,
-                "uptime_seconds": heartbeat_data.uptime_seconds
-            }
+            data=response_data
         )
         
     except Exception as e:
@@ -1182,41 +1689,54 @@ def receive_signal_from_vps(
     Flow: VPS AI → generates signal → POST /api/signals/receive → stored in DB → frontend shows via /api/vps/signals/live
     """
     try:
-        # Create signal from VPS data
-        new_signal = Signal(
-            symbol=signal_data.signal.symbol,
-            signal_type=signal_data.signal.signal_type,
-            entry_price=signal_data.signal.entry_price,
-            stop_loss=signal_data.signal.stop_loss,
-            take_profit=signal_data.signal.take_profit,
-            reliability=signal_data.reliability or signal_data.signal.reliability or 0.0,
-            ai_analysis=signal_data.ai_analysis or signal_data.signal.ai_analysis,
-            confidence_score=signal_data.confidence_score or signal_data.signal.confidence_score or 0.0,
-            risk_level=signal_data.signal.risk_level or "MEDIUM",
-            vps_id=signal_data.vps_id,
-            source="VPS_AI",
-            is_public=True,
-            is_active=True,
-            created_at=signal_data.generated_at,
-            expires_at=signal_data.signal.expires_at
-        )
+        if ingest_journal:
+            # Write-behind: durable in the journal, committed to DB by the background writer
+            journal_seq = ingest_journal.append("signal", signal_data.model_dump(mode="json"))
+            return APIResponse(
+                status="accepted",
+                message="Signal accepted, queued for database write",
+                data={
+                    "journal_seq": journal_seq,
+                    "symbol": signal_data.signal.symbol,
+                    "signal_type": signal_data.signal.signal_type.value,
+                    "vps_id": signal_data.vps_id,
+                    "idempotency_key": signal_idempotency_key(signal_data)
+                }
+            )
         
-        db.add(new_signal)
+        # Insert-or-ignore: a retried push hits the unique idempotency_key and is dropped by the DB
+        values = vps_signal_values(signal_data)
+        signal_id = insert_signals_ignore_duplicates(db, [values]).get(values["idempotency_key"])
         db.commit()
-        db.refresh(new_signal)
         
-        print(f"📊 Signal received from VPS {signal_data.vps_id}: {new_signal.symbol} {new_signal.signal_type} @ {new_signal.entry_price}")
+        response_data = {
+            "signal_id": signal_id,
+            "symbol": signal_data.signal.symbol,
+            "signal_type": signal_data.signal.signal_type.value,
+            "reliability": values["reliability"],
+            "vps_id": signal_data.vps_id,
+            "idempotency_key": values["idempotency_key"]
+        }
+        
+        if signal_id is None:
+            # Only on the (rare) duplicate path: report the id of the original signal
+            response_data["signal_id"] = db.query(Signal.id).filter(
+                Signal.idempotency_key == values["idempotency_key"]
+            ).scalar()
+            print(f"Duplicate signal from VPS {signal_data.vps_id} ignored: {signal_data.signal.symbol} (key {values['idempotency_key'][:12]})")
+            return APIResponse(
+                status="duplicate",
+                message="Signal already received",
+                data=response_data
+            )
+        
+        publish_new_signals([values], {values["idempotency_key"]: signal_id})
+        print(f"📊 Signal received from VPS {signal_data.vps_id}: {signal_data.signal.symbol} {signal_data.signal.signal_type.value} @ {signal_data.signal.entry_price}")
         
         return APIResponse(
             status="success",
             message=f"Signal received and saved",
-            data={
-                "signal_id": new_signal.id,
-                "symbol": new_signal.symbol,
-                "signal_type": new_signal.signal_type.value,
-                "reliability": new_signal.reliability,
-                "vps_id": signal_data.vps_id
-            }
+            data=response_data
         )
         
     except Exception as e:
@@ -1227,37 +1747,150 @@ def receive_signal_from_vps(
             detail=f"Error processing signal: {str(e)}"
         )
 
+@app.post("/api/signals/receive/batch", response_model=APIResponse)
+def receive_signal_batch_from_vps(
+    batch_data: VPSSignalBatchReceive,
+    request: Request,
+    db: Session = Depends(get_db),
+    _: bool = Depends(verify_vps_api_key)
+):
+    """
+    Receive a burst of trading signals from VPS in one request
+    
+    Same payload per item as /api/signals/receive, wrapped in {"signals": [...]}.
+    Items are validated one by one: invalid items are reported in the results
+    and do not block the valid ones. All valid items are written with a single
+    bulk INSERT and one commit (one round trip, one fsync). With
+    INGEST_MODE=journal the valid items are journaled and acked as "accepted".
+    Batches above VPS_SIGNAL_BATCH_MAX items are rejected (422) by the schema.
+    
+    Required header: X-VPS-API-Key: [MT5_SECRET_KEY environment variable]
+    """
+    # Validate every item, keep the position to report per-item results
+    results = [None] * len(batch_data.signals)
+    valid_items = []
+    for index, raw_signal in enumerate(batch_data.signals):
+        try:
+            valid_items.append((index, VPSSignalReceive.model_validate(raw_signal)))
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "errors": [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()]
+            }
+    
+    saved = 0
+    duplicates = 0
+    failed = len(results) - len(valid_items)
+    if valid_items and ingest_journal:
+        # Write-behind: one journal write/fsync for the batch, committed to DB by the background writer
+        journal_seqs = ingest_journal.append_many(
+            "signal", [signal_data.model_dump(mode="json") for _, signal_data in valid_items]
+        )
+        for (index, signal_data), journal_seq in zip(valid_items, journal_seqs):
+            results[index] = {
+                "index": index,
+                "status": "accepted",
+                "journal_seq": journal_seq,
+                "symbol": signal_data.signal.symbol,
+                "idempotency_key": signal_idempotency_key(signal_data)
+            }
+        print(f"📊 Signal batch accepted: {len(valid_items)} queued, {failed} rejected")
+        return APIResponse(
+            status="accepted" if not failed else "partial",
+            message=f"Batch accepted: {len(valid_items)} queued for database write, {failed} rejected",
+            data={
+                "received": len(results),
+                "accepted": len(valid_items),
+                "failed": failed,
+                "results": results
+            }
+        )
+
+    if valid_items:
+        try:
+            rows = [vps_signal_values(signal_data) for _, signal_data in valid_items]
+            # Duplicates (retries, or repeated items in the same batch) are skipped by the DB:
+            # map the returned rows back to items through their idempotency key
+            inserted_ids = insert_signals_ignore_duplicates(db, rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error processing VPS signal batch: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing signal batch: {str(e)}"
+            )
+        publish_new_signals(rows, inserted_ids)
+        
+        for (index, signal_data), row in zip(valid_items, rows):
+            key = row["idempotency_key"]
+            signal_id = inserted_ids.pop(key, None)
+            if signal_id is not None:
+                saved += 1
+            else:
+                duplicates += 1
+            results[index] = {
+                "index": index,
+                "status": "created" if signal_id is not None else "duplicate",
+                "signal_id": signal_id,
+                "symbol": signal_data.signal.symbol,
+                "idempotency_key": key
+            }
+    
+    print(f"📊 Signal batch received: {saved} saved, {duplicates} duplicates, {failed} rejected")
+    
+    return APIResponse(
+        status="success" if not failed else "partial",
+        message=f"Batch processed: {saved} saved, {duplicates} duplicates, {failed} rejected",
+        data={
+            "received": len(results),
+            "saved": saved,
+            "duplicates": duplicates,
+            "failed": failed,
+            "results": results
+        }
+    )
+
 @app.get("/api/signals/latest")
 def get_latest_signals_for_dashboard(
+    request: Request,
+    response: Response,
     limit: int = 10,
     db: Session = Depends(get_db)
 ):
     """Get latest signals for dashboard display"""
+    cached = not_modified(request, response, signal_etag("latest", limit))
+    if cached:
+        return cached
+
     try:
-        latest_signals = db.query(Signal).filter(
-            Signal.is_active == True,
-            Signal.is_public == True
-        ).order_by(Signal.created_at.desc()).limit(limit).all()
+        latest_signals = live_signal_cache.latest(limit)
+        if latest_signals is None:
+            latest_signals = [entry_from_row(signal) for signal in db.query(*signal_list_columns()).filter(
+                Signal.is_active == True,
+                Signal.is_public == True
+            ).order_by(Signal.created_at.desc()).limit(limit).all()]
         
-        return {
+        return orjson_response({
             "status": "success",
             "signals": [
                 {
-                    "id": signal.id,
-                    "symbol": signal.symbol,
-                    "signal_type": signal.signal_type.value,
-                    "entry_price": signal.entry_price,
-                    "stop_loss": signal.stop_loss,
-                    "take_profit": signal.take_profit,
-                    "reliability": signal.reliability,
-                    "created_at": signal.created_at.isoformat(),
-                    "vps_id": signal.vps_id,
-                    "ai_analysis": signal.ai_analysis[:200] + "..." if signal.ai_analysis and len(signal.ai_analysis) > 200 else signal.ai_analysis
+                    "id": signal["id"],
+                    "symbol": signal["symbol"],
+                    "signal_type": signal["signal_type"],
+                    "entry_price": signal["entry_price"],
+                    "stop_loss": signal["stop_loss"],
+                    "take_profit": signal["take_profit"],
+                    "reliability": signal["reliability"],
+                    "created_at": signal["created_at"].isoformat(),
+                    "vps_id": signal["vps_id"],
+                    "ai_analysis": signal["ai_analysis"] + "..." if signal["ai_analysis_truncated"] else signal["ai_analysis"]
                 }
                 for signal in latest_signals
             ],
             "count": len(latest_signals)
-        }
+        }, response)
     except Exception as e:
         print(f"Error fetching latest signals: {str(e)}")
         raise HTTPException(
@@ -1265,8 +1898,181 @@ def get_latest_signals_for_dashboard(
             detail="Error fetching signals"
         )
 
+@app.get("/api/signals/{signal_id}/analysis")
+def get_signal_analysis(signal_id: int, db: Session = Depends(get_db)):
+    """Full AI analysis text of a public signal (list endpoints only return a preview)"""
+    signal = db.query(Signal.id, Signal.symbol, Signal.ai_analysis).filter(
+        Signal.id == signal_id,
+        Signal.is_public == True
+    ).first()
+    if not signal:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Segnale non trovato"
+        )
+    return {
+        "status": "success",
+        "signal_id": signal.id,
+        "symbol": signal.symbol,
+        "ai_analysis": signal.ai_analysis
+    }
+
+def format_live_signal(signal: dict) -> dict:
+    """Frontend format of a live VPS signal (cache entry) - explanation is a preview"""
+    explanation = signal["ai_analysis"] or "AI analysis available"
+    if signal["ai_analysis_truncated"]:
+        explanation += "..."
+    return {
+        "id": signal["id"],
+        "symbol": signal["symbol"],
+        "signal_type": signal["signal_type"] or "",
+        "entry_price": signal["entry_price"] or 0,
+        "stop_loss": signal["stop_loss"] or 0,
+        "take_profit": signal["take_profit"] or 0,
+        "reliability": signal["reliability"] or 0,
+        "explanation": explanation,
+        "analysis_truncated": signal["ai_analysis_truncated"],
+        "timestamp": signal["created_at"].isoformat() if signal["created_at"] else "",
+        "timeframe": "H1",  # Default timeframe
+        "risk_reward": 3.0,  # Default risk/reward
+        "technical_scores": {},
+        "volume": 0.01,
+        "vps_id": signal["vps_id"]
+    }
+
+def signal_event_data(signal: dict) -> dict:
+    """Payload of a "signal" stream event: same format as /api/vps/signals/live"""
+    return format_live_signal(signal)
+
+def init_signal_stream():
+    """Signals committed before startup are not in the stream history: resume for them goes to the DB"""
+    db = SessionLocal()
+    try:
+        signal_stream.set_floor(db.query(func.max(Signal.id)).scalar())
+    finally:
+        db.close()
+
+def load_signal_events_since(last_event_id: int) -> list:
+    """Stream events after last_event_id, from the database (resume past the in-memory history)"""
+    db = SessionLocal()
+    try:
+        signals = db.query(*signal_list_columns()).filter(
+            Signal.id > last_event_id,
+            Signal.is_active == True,
+            Signal.is_public == True,
+            Signal.source == "VPS_AI"
+        ).order_by(Signal.id.asc()).limit(SIGNAL_STREAM_HISTORY).all()
+        return [(signal.id, "signal", signal_event_data(entry_from_row(signal))) for signal in signals]
+    finally:
+        db.close()
+
+@app.get("/api/vps/signals/stream")
+async def stream_vps_signals(request: Request, last_event_id: Optional[str] = None):
+    """
+    Server-Sent Events stream of new VPS signals
+    
+    Every signal accepted from the VPS is pushed as an event "signal" with
+    id = signal id. Reconnecting clients send Last-Event-ID (browsers do it
+    automatically, or ?last_event_id=) and receive only the signals they missed.
+    """
+    resume_from = request.headers.get("Last-Event-ID") or last_event_id
+    try:
+        resume_id = int(resume_from) if resume_from else None
+    except ValueError:
+        resume_id = None
+    
+    async def event_generator():
+        # Subscribe before replaying so nothing published in between is lost
+        subscriber = signal_stream.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            replayed = set()
+            if resume_id is not None:
+                backlog = signal_stream.events_since(resume_id)
+                if backlog is None:
+                    backlog = await run_in_threadpool(load_signal_events_since, resume_id)
+                for event_id, event, data in backlog:
+                    replayed.add(event_id)
+                    yield format_sse(data, event, event_id)
+            
+            # A client that cannot keep up is dropped and resumes from Last-Event-ID
+            while not subscriber.overflowed:
+                try:
+                    event_id, event, data = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if event_id in replayed:
+                    continue
+                yield format_sse(data, event, event_id)
+        finally:
+            signal_stream.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/ws")
+async def websocket_updates(websocket: WebSocket, token: Optional[str] = None):
+    """
+    WebSocket updates with topic subscriptions (auth: ?token=<access token>)
+    
+    Client messages:
+      {"action": "subscribe", "topics": ["quotes:EURUSD", "signals:EURUSD", "vps:vps-001"]}
+      {"action": "unsubscribe", "topics": [...]}
+      {"action": "ping"}
+    "signals:*", "quotes:*" and "vps:*" subscribe to every symbol / VPS.
+    Server messages: {"topic": "...", "data": {...}} for updates,
+    {"type": "..."} for replies.
+    """
+    if not token:
+        await websocket.close(code=1008)
+        return
+    try:
+        user = await run_in_threadpool(user_from_token, token)
+        if not user.is_active:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    connection = ws_hub.connect(websocket)
+    sender = asyncio.create_task(connection.run_sender())
+    ws_hub.send_control(connection, {"type": "welcome", "user": user.username, "topics": list(WebSocketHub.TOPIC_PREFIXES)})
+    try:
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action") if isinstance(message, dict) else None
+            topics = message.get("topics") if isinstance(message, dict) else None
+            topics = [str(topic) for topic in topics] if isinstance(topics, list) else []
+            
+            if action == "subscribe":
+                accepted = ws_hub.subscribe(connection, topics)
+                ws_hub.send_control(connection, {
+                    "type": "subscribed",
+                    "topics": accepted,
+                    "rejected": [topic for topic in topics if topic not in accepted and topic not in connection.topics]
+                })
+            elif action == "unsubscribe":
+                ws_hub.unsubscribe(connection, topics)
+                ws_hub.send_control(connection, {"type": "unsubscribed", "topics": topics})
+            elif action == "ping":
+                ws_hub.send_control(connection, {"type": "pong", "server_time": datetime.utcnow().isoformat()})
+            else:
+                ws_hub.send_control(connection, {"type": "error", "message": "Unknown action"})
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        ws_hub.disconnect(connection)
+        sender.cancel()
+
 @app.get("/api/vps/signals/live")
-def get_live_vps_signals(limit: int = 20, db: Session = Depends(get_db)):
+def get_live_vps_signals(request: Request, response: Response, limit: int = 20, db: Session = Depends(get_db)):
     """
     Get live AI signals from database (pushed by VPS)
     
@@ -1289,38 +2095,32 @@ def get_live_vps_signals(limit: int = 20, db: Session = Depends(get_db)):
     - Better performance (cached in database)
     - VPS controls the data flow
     """
+    # Read before the signals, so the tag is never newer than the content it is served with
+    marker = live_signal_cache.marker()
     try:
-        # Get latest signals from database (received via VPS push)
-        latest_signals = db.query(Signal).filter(
-            Signal.is_active == True,
-            Signal.is_public == True,
-            Signal.source == "VPS_AI"  # Only VPS signals
-        ).order_by(Signal.created_at.desc()).limit(limit).all()
-        
-        # Format signals for frontend
-        formatted_signals = []
-        for signal in latest_signals:
-            formatted_signals.append({
-                "symbol": signal.symbol,
-                "signal_type": signal.signal_type.value if signal.signal_type else "",
-                "entry_price": signal.entry_price or 0,
-                "stop_loss": signal.stop_loss or 0,
-                "take_profit": signal.take_profit or 0,
-                "reliability": signal.reliability or 0,
-                "explanation": signal.ai_analysis or "AI analysis available",
-                "timestamp": signal.created_at.isoformat() if signal.created_at else "",
-                "timeframe": "H1",  # Default timeframe
-                "risk_reward": 3.0,  # Default risk/reward
-                "technical_scores": {},
-                "volume": 0.01,
-                "vps_id": signal.vps_id
-            })
-        
+        # Latest signals received via VPS push: in-memory buffer first, database on miss
+        latest_signals = live_signal_cache.latest(limit, source="VPS_AI")
+        if latest_signals is None:
+            latest_signals = [entry_from_row(signal) for signal in db.query(*signal_list_columns()).filter(
+                Signal.is_active == True,
+                Signal.is_public == True,
+                Signal.source == "VPS_AI"  # Only VPS signals
+            ).order_by(Signal.created_at.desc()).limit(limit).all()]
+
         # Check if we have recent signals (less than 1 hour old)
-        recent_signals = [s for s in latest_signals if s.created_at and (datetime.utcnow() - s.created_at).total_seconds() < 3600]
+        recent_signals = [s for s in latest_signals if s["created_at"] and (datetime.utcnow() - s["created_at"]).total_seconds() < 3600]
         vps_status = "active" if recent_signals else "no_recent_signals"
-        
-        return {
+
+        # vps_status depends on the age of the newest signal, so it is part of the tag
+        etag = signal_etag("live", limit, int(bool(recent_signals)), marker=marker) if marker else None
+        cached = not_modified(request, response, etag)
+        if cached:
+            return cached
+
+        # Format signals for frontend
+        formatted_signals = [format_live_signal(signal) for signal in latest_signals]
+
+        return orjson_response({
             "status": "success",
             "source": "DATABASE_VPS_PUSH",
             "signals": formatted_signals,
@@ -1328,7 +2128,7 @@ def get_live_vps_signals(limit: int = 20, db: Session = Depends(get_db)):
             "vps_status": vps_status,
             "timestamp": datetime.utcnow().isoformat(),
             "message": f"Loaded {len(formatted_signals)} signals from database"
-        }
+        }, response)
         
     except Exception as e:
         print(f"Error fetching database VPS signals: {str(e)}")
@@ -1406,6 +2206,10 @@ def reset_database_schema(
         # Recreate all tables with new schema
         print("Creating tables with new schema...")
         Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        run_online_migrations(engine, background=False)
+        live_signal_cache.clear()
+        auth_user_cache.clear()
         print("All tables recreated successfully")
         
         return APIResponse(
@@ -1462,10 +2266,13 @@ def debug_register(user: UserCreate, db: Session = Depends(get_db)):
         
         # Test 5: Commit
         db.commit()
+        login_throttle.forget_unknown(db_user.username, db_user.email)
         print(f"DEBUG: Database commit successful")
         
         return {"status": "success", "user_id": db_user.id, "message": "Debug registration successful"}
         
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         db.rollback()
         print(f"DEBUG ERROR: {str(e)}")
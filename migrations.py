@@ -0,0 +1,124 @@
+"""
+Lightweight schema migrations run at startup
+
+Base.metadata.create_all() only creates missing tables: columns and indexes
+added to existing tables are applied here. Every step is idempotent.
+
+MIGRATIONS run synchronously before the app serves requests.
+ONLINE_MIGRATIONS (index builds) run in a background thread: on PostgreSQL
+they use CREATE INDEX CONCURRENTLY, which does not lock the table for writes.
+idempotency_index_ready is set once the unique signals.idempotency_key index
+is usable (ON CONFLICT needs it); until then ingest dedupes by lookup.
+Run `python migrations.py` to apply everything from a one-off shell instead.
+"""
+
+import threading
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from models import HOT_QUERY_INDEXES, Signal
+
+IDEMPOTENCY_INDEX = next(index for index in Signal.__table__.indexes if index.name == "ix_signals_idempotency_key")
+
+# Set when the unique idempotency_key index exists and is valid
+idempotency_index_ready = threading.Event()
+
+
+def _has_column(conn, table, column):
+    return column in {col["name"] for col in inspect(conn).get_columns(table)}
+
+
+def add_signal_idempotency_key(engine):
+    """signals.idempotency_key column (dedup of VPS retries); its unique index is built online"""
+    with engine.begin() as conn:
+        if not _has_column(conn, "signals", "idempotency_key"):
+            print("Migration: adding signals.idempotency_key")
+            conn.execute(text("ALTER TABLE signals ADD COLUMN idempotency_key VARCHAR(64)"))
+
+
+def _create_index_online(engine, index):
+    """CREATE INDEX [CONCURRENTLY] IF NOT EXISTS, rebuilding a leftover invalid index"""
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(ddl))
+        return
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        is_valid = conn.execute(text(
+            "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name"
+        ), {"name": index.name}).scalar()
+        if is_valid:
+            return
+        if is_valid is False:
+            # A previous concurrent build failed half-way: IF NOT EXISTS would skip it
+            print(f"Migration: dropping invalid index {index.name}")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+        print(f"Migration: building index {index.name} concurrently")
+        conn.execute(text(ddl.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)))
+
+
+def add_signal_idempotency_index(engine):
+    """Unique index on signals.idempotency_key, built without blocking writes"""
+    _create_index_online(engine, IDEMPOTENCY_INDEX)
+    idempotency_index_ready.set()
+
+
+def add_hot_query_indexes(engine):
+    """Composite/partial indexes for the hot signal queries (models.HOT_QUERY_INDEXES)"""
+    for index in HOT_QUERY_INDEXES:
+        _create_index_online(engine, index)
+
+
+MIGRATIONS = [
+    add_signal_idempotency_key,
+]
+
+ONLINE_MIGRATIONS = [
+    add_signal_idempotency_index,
+    add_hot_query_indexes,
+]
+
+
+def _apply(engine, migrations):
+    for migration in migrations:
+        try:
+            migration(engine)
+        except Exception as e:
+            print(f"Migration {migration.__name__} failed: {e}")
+            raise
+
+
+def run_migrations(engine):
+    """Apply all blocking migrations in order"""
+    _apply(engine, MIGRATIONS)
+
+
+def run_online_migrations(engine, background=True):
+    """Apply online migrations, by default in a daemon thread so startup is not delayed"""
+    if not background:
+        _apply(engine, ONLINE_MIGRATIONS)
+        return None
+
+    def worker():
+        try:
+            _apply(engine, ONLINE_MIGRATIONS)
+            print("Online migrations completed")
+        except Exception:
+            # Already logged; the app keeps working without the new indexes
+            pass
+
+    thread = threading.Thread(target=worker, name="online-migrations", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    from database import engine
+    run_migrations(engine)
+    run_online_migrations(engine, background=False)
+    print("Migrations completed")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -61,6 +61,7 @@ class Signal(Base):
     # VPS info
     vps_id = Column(String(50))  # ID della VPS che ha generato il segnale
     source = Column(String(50), default="VPS_AI")  # VPS_AI, MANUAL, API
+    idempotency_key = Column(String(64), unique=True, index=True)  # dedup VPS retries
     
     # Foreign keys
     creator_id = Column(Integer, ForeignKey("users.id"))
@@ -140,4 +141,45 @@ class VPSHeartbeat(Base):
     last_signal_at = Column(DateTime)
     mt5_status = Column(String(20))  # connected, disconnected, error
     
-    created_at = Column(DateTime, default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, default=func.now())
+
+class RefreshToken(Base):
+    """Issued refresh tokens: one row per token, rotated tokens share a family"""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(64), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime)  # set when exchanged at /token/refresh
+    revoked = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+# Indexes for the hot signal/heartbeat queries in main.py.
+# Existing databases get them through migrations.py (CREATE INDEX CONCURRENTLY on PostgreSQL).
+_live_signal = (Signal.is_active == True) & (Signal.is_public == True)
+
+HOT_QUERY_INDEXES = [
+    # /api/vps/signals/live: active public VPS signals, newest first
+    Index("ix_signals_public_active_source_created",
+          Signal.is_public, Signal.is_active, Signal.source, Signal.created_at.desc()),
+    # /api/signals/latest, live cache load, active counts: only live signals are indexed
+    Index("ix_signals_live_created", Signal.created_at.desc(),
+          postgresql_where=_live_signal, sqlite_where=_live_signal),
+    # /signals/top: live signals by reliability
+    Index("ix_signals_live_reliability", Signal.reliability.desc(),
+          postgresql_where=_live_signal, sqlite_where=_live_signal),
+    # /me and /mt5/pending-orders: per-user signals by status / active flag
+    Index("ix_signals_creator_status", Signal.creator_id, Signal.status, Signal.is_active),
+    Index("ix_signals_creator_active", Signal.creator_id, Signal.is_active),
+    # /signals: keyset pagination of a user's history on (created_at, id)
+    Index("ix_signals_creator_created_id", Signal.creator_id, Signal.created_at.desc(), Signal.id.desc()),
+    # Expiry sweeper: active signals by expires_at
+    Index("ix_signals_active_expires", Signal.expires_at,
+          postgresql_where=Signal.is_active == True, sqlite_where=Signal.is_active == True),
+    # /api/landing/recent-signals: closed public signals, newest first
+    Index("ix_signals_public_status_created", Signal.is_public, Signal.status, Signal.created_at.desc()),
+    # /health and /api/vps/status: recent heartbeats
+    Index("ix_vps_heartbeats_timestamp", VPSHeartbeat.timestamp.desc()),
+]
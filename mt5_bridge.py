@@ -0,0 +1,317 @@
+"""
+HTTP access to the MT5/VPS bridge (MT5_BRIDGE_URL)
+
+A single httpx.AsyncClient with keep-alive pooling is shared by every bridge
+call, so quote requests reuse open connections instead of paying a TCP (and
+TLS) handshake each time. The client is opened/closed by the app lifespan.
+
+Every call goes through a CircuitBreaker: after consecutive failures (network
+errors, timeouts, 5xx) the circuit opens and calls fail immediately with
+BridgeUnavailable for a cooldown. Then a single probe call is let through:
+success closes the circuit, failure opens it for another cooldown.
+
+BridgePool spreads calls over several bridges (one per VPS). Each endpoint
+keeps a latency EWMA and a window of recent latencies; calls go to the
+fastest endpoint whose circuit is closed and fail over to the next one on
+errors, 5xx answers included (the last 5xx is returned if every bridge fails
+that way). With hedging enabled, a call still pending after the endpoint's
+p95 latency is duplicated on the next endpoint and the first response wins.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+import httpx
+
+
+class BridgeUnavailable(Exception):
+    """Raised without contacting the bridge while the circuit is open"""
+
+
+class BridgeServerError(Exception):
+    """A bridge answered 5xx (BridgePool fails over; the response is kept)"""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.opened_count = 0
+        self.short_circuited = 0
+        self.last_error = None
+
+    def allow(self):
+        """True if a call may go to the bridge now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            # Cooldown elapsed: this caller becomes the only probe
+            self.state = self.HALF_OPEN
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            print("MT5 bridge circuit closed")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self, error):
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state == self.CLOSED:
+                print(f"MT5 bridge circuit opened after {self.consecutive_failures} failures: {error}")
+                self.opened_count += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """The probe was cancelled before completing: let the next caller probe"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def retry_in(self):
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "cooldown_seconds": self.cooldown,
+            "retry_in_seconds": round(self.retry_in(), 3),
+            "opened_count": self.opened_count,
+            "short_circuited": self.short_circuited,
+            "last_error": self.last_error
+        }
+
+
+class BridgeClient:
+    """Shared pooled HTTP client for one bridge endpoint"""
+
+    def __init__(self, base_url, max_connections=20, max_keepalive=10, keepalive_expiry=30.0,
+                 timeout=10.0, connect_timeout=5.0, breaker_failures=5, breaker_cooldown=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.breaker = CircuitBreaker(failure_threshold=breaker_failures, cooldown=breaker_cooldown)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._client = None
+
+    @property
+    def client(self):
+        # Created lazily so the bridge can also be used outside the lifespan (scripts)
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def get(self, path, timeout=None, **kwargs):
+        """GET base_url + path; timeout overrides the default read timeout for this call"""
+        if not self.breaker.allow():
+            raise BridgeUnavailable(
+                f"MT5 bridge circuit open, retry in {self.breaker.retry_in():.1f}s"
+            )
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=min(timeout, self.timeout.connect))
+        try:
+            response = await self.client.get(path, **kwargs)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self.breaker.record_failure(str(e) or type(e).__name__)
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class BridgeEndpoint:
+    """One bridge in a BridgePool with its latency statistics"""
+
+    EWMA_ALPHA = 0.3
+    MIN_SAMPLES_FOR_P95 = 20
+
+    def __init__(self, client, window=200):
+        self.client = client
+        self.latency_ewma = None
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def record_latency(self, seconds):
+        self.latencies.append(seconds)
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma += self.EWMA_ALPHA * (seconds - self.latency_ewma)
+
+    def p95(self):
+        if len(self.latencies) < self.MIN_SAMPLES_FOR_P95:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def score(self):
+        # An open circuit whose cooldown has elapsed goes first so it gets its probe
+        # (otherwise it would never recover while others answer), then healthy
+        # endpoints by latency; endpoints never measured are tried early
+        breaker = self.client.breaker
+        if breaker.state == CircuitBreaker.OPEN and breaker.retry_in() == 0:
+            rank = 0
+        elif breaker.state == CircuitBreaker.CLOSED:
+            rank = 1
+        else:
+            rank = 2
+        return (rank, self.latency_ewma or 0.0)
+
+    def stats(self):
+        p95 = self.p95()
+        return {
+            "url": self.client.base_url,
+            "circuit": self.client.breaker.stats(),
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+
+
+class BridgePool:
+    """Latency-aware routing, failover and optional hedging over several bridges"""
+
+    def __init__(self, base_urls, hedge=False, hedge_min_delay=0.05, **client_kwargs):
+        self.endpoints = [BridgeEndpoint(BridgeClient(url, **client_kwargs)) for url in base_urls]
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def ranked(self):
+        return sorted(self.endpoints, key=BridgeEndpoint.score)
+
+    async def _call(self, endpoint, path, timeout, kwargs):
+        started = time.monotonic()
+        try:
+            response = await endpoint.client.get(path, timeout=timeout, **kwargs)
+        except BridgeUnavailable:
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge race: its latency is at least this much
+            endpoint.record_latency(time.monotonic() - started)
+            raise
+        except Exception:
+            endpoint.requests += 1
+            endpoint.errors += 1
+            raise
+        endpoint.requests += 1
+        if response.status_code >= 500:
+            endpoint.errors += 1
+            raise BridgeServerError(response)
+        endpoint.record_latency(time.monotonic() - started)
+        return response
+
+    def _hedge_delay(self, primary, secondary):
+        if not self.hedge or secondary.client.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        p95 = primary.p95()
+        if p95 is None:
+            return None
+        return max(p95, self.hedge_min_delay)
+
+    async def _hedged(self, primary, secondary, delay, path, timeout, kwargs):
+        """Call primary, adding secondary after delay or as soon as primary fails"""
+        first = asyncio.create_task(self._call(primary, path, timeout, kwargs))
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            error = None
+            if done:
+                error = first.exception()
+                if error is None:
+                    return first.result()
+                self.failovers += 1
+            else:
+                self.hedged += 1
+
+            second = asyncio.create_task(self._call(secondary, path, timeout, kwargs))
+            pending.add(second)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get(self, path, timeout=None, **kwargs):
+        """GET path on the best endpoint, failing over to the others on errors and 5xx"""
+        candidates = self.ranked()
+        error = None
+        index = 0
+        while index < len(candidates):
+            primary = candidates[index]
+            secondary = candidates[index + 1] if index + 1 < len(candidates) else None
+            delay = self._hedge_delay(primary, secondary) if secondary else None
+            if error is not None:
+                self.failovers += 1
+            try:
+                if delay is None:
+                    index += 1
+                    return await self._call(primary, path, timeout, kwargs)
+                index += 2
+                return await self._hedged(primary, secondary, delay, path, timeout, kwargs)
+            except Exception as e:
+                error = e
+        if isinstance(error, BridgeServerError):
+            return error.response
+        raise error
+
+    async def aclose(self):
+        for endpoint in self.endpoints:
+            await endpoint.client.aclose()
+
+    def stats(self):
+        return {
+            "hedging": self.hedge,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "endpoints": [endpoint.stats() for endpoint in self.ranked()]
+        }
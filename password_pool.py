@@ -0,0 +1,115 @@
+"""
+Bcrypt hashing in a dedicated bounded process pool
+
+bcrypt is deliberately slow (hundreds of ms per call at the default cost) and
+holds the CPU for the whole call. Run inline in sync endpoints, a burst of
+registrations/logins occupies the shared threadpool and the interpreter and
+starves every other endpoint.
+
+PasswordHasherPool moves the work to a few worker processes (BCRYPT_WORKERS)
+and bounds the calls in flight, queued or running (BCRYPT_MAX_PENDING): the
+request thread only waits on the result, at most max_pending request threads
+can be waiting, and further calls are refused at once with PasswordHasherBusy
+(answered 503 + Retry-After by main.py) instead of piling up.
+
+This module only imports passlib, so spawned workers stay light (workers also
+re-import the entry script, which must keep its startup under an
+`if __name__ == "__main__"` guard, as uvicorn's does). The cost
+factor is BCRYPT_ROUNDS (see benchmark_bcrypt.py to choose it); existing
+hashes keep verifying whatever their cost.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when max_pending hash/verify calls are already in flight"""
+
+
+# Worker functions (module level so they can be pickled by reference)
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _verify(password, hashed_password):
+    return pwd_context.verify(password, hashed_password)
+
+
+def _ping():
+    return True
+
+
+class PasswordHasherPool:
+    """Process pool for bcrypt with a bound on in-flight calls
+
+    Before start() (scripts, tests) calls run inline in the caller.
+    """
+
+    def __init__(self, workers=2, max_pending=8):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Start the worker processes ("spawn": no fork of a threaded server)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            # Start the workers now rather than on the first login
+            for future in [self._executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+
+    def stop(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func, *args):
+        executor = self._executor
+        if executor is None:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return executor.submit(func, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password)
+
+    def verify(self, password, hashed_password):
+        return self._run(_verify, password, hashed_password)
+
+    def stats(self):
+        return {
+            "running": self._executor is not None,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
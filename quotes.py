@@ -0,0 +1,288 @@
+"""
+Quote snapshots fed by a background poller
+
+The app lifespan runs one poller that fetches the bridge's /signals/latest at
+a fixed cadence, converts the payload once (symbols resolved through the
+InstrumentRegistry, see instruments.py) and publishes an immutable
+QuoteSnapshot to QuoteFeed. Request handlers only read QuoteFeed.snapshot:
+their latency does not depend on the bridge and the upstream load is one
+request per poll interval, however many clients are online.
+
+Every snapshot carries a version that increases whenever quotes change, plus
+the version at which each symbol last changed, so clients polling with
+since=<version> only receive what moved. Versions start from the process
+start time in milliseconds: a version from before a restart is always lower
+than any version of the new process and is answered with the full map.
+
+TickHistory keeps recent (time, bid, ask) ticks per symbol for charts. Each
+symbol has a fixed-size ring of three packed float arrays, so memory is
+24 bytes per tick slot, allocated once, with no Python object per tick.
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from types import MappingProxyType
+
+
+def vps_signals_to_quotes(signals, registry):
+    """Convert VPS AI signals (bridge /signals/latest) to quote format in one pass, keyed by symbol
+
+    Symbols are normalized and priced with the InstrumentRegistry; symbols it
+    does not know are kept as sent, with no spread.
+    """
+    resolve = registry.resolve
+    quotes = {}
+    for signal in signals:
+        entry_price = signal.get("entry_price") or 0
+        if entry_price <= 0:
+            continue
+        raw_symbol = signal.get("symbol") or ""
+        instrument = resolve(raw_symbol)
+        if instrument is not None:
+            symbol = instrument.symbol
+            bid = round(entry_price, instrument.digits)
+            ask = round(entry_price + instrument.spread, instrument.digits)
+            spread = instrument.spread
+        else:
+            symbol = raw_symbol.strip().upper()
+            if not symbol:
+                continue
+            bid = ask = entry_price
+            spread = 0.0
+        quotes[symbol] = MappingProxyType({
+            "symbol": symbol,
+            "bid": bid,
+            "ask": ask,
+            "spread": spread,
+            "time": signal.get("timestamp", ""),
+            "change": 0.0,
+            "signal_type": signal.get("signal_type", ""),
+            "reliability": signal.get("reliability", 0),
+            "ai_explanation": signal.get("explanation", "")
+        })
+    return quotes
+
+
+@dataclass(frozen=True)
+class QuoteSnapshot:
+    """One poll result; never mutated after publication, so readers need no lock"""
+
+    bridge_connected: bool
+    quotes: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    fetched_at: datetime = None
+    fetched_monotonic: float = None
+    error: str = None
+    # Set by QuoteFeed.publish
+    version: int = 0
+    symbol_versions: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    removed_versions: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def create(cls, quotes=None, error=None):
+        return cls(
+            bridge_connected=error is None,
+            quotes=MappingProxyType(dict(quotes or {})),
+            fetched_at=datetime.utcnow(),
+            fetched_monotonic=time.monotonic(),
+            error=error
+        )
+
+    def age(self):
+        """Seconds since the poll, or None before the first poll"""
+        if self.fetched_monotonic is None:
+            return None
+        return time.monotonic() - self.fetched_monotonic
+
+    def select(self, symbols):
+        """Plain dict of the quotes available for symbols (canonical names)"""
+        return {
+            symbol: dict(self.quotes[symbol])
+            for symbol in symbols
+            if symbol in self.quotes
+        }
+
+    def changes_since(self, since, symbols):
+        """Quotes of symbols changed after version since, and symbols removed after it"""
+        quotes = {
+            symbol: dict(self.quotes[symbol])
+            for symbol in symbols
+            if symbol in self.quotes and self.symbol_versions[symbol] > since
+        }
+        removed = [
+            symbol for symbol in symbols
+            if symbol not in self.quotes and self.removed_versions.get(symbol, 0) > since
+        ]
+        return quotes, removed
+
+
+class QuoteFeed:
+    """Holder of the current QuoteSnapshot, replaced atomically by the poller"""
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.base_version = int(time.time() * 1000)
+        self.snapshot = QuoteSnapshot(bridge_connected=False, version=self.base_version)
+        self._lock = threading.Lock()
+        self.polls = 0
+        self.failures = 0
+
+    def publish(self, snapshot):
+        """Version and swap in a new snapshot; returns the previous one"""
+        with self._lock:
+            previous = self.snapshot
+            changed = {symbol for symbol, quote in snapshot.quotes.items() if previous.quotes.get(symbol) != quote}
+            removed = [symbol for symbol in previous.quotes if symbol not in snapshot.quotes]
+            version = previous.version
+            if changed or removed or snapshot.bridge_connected != previous.bridge_connected:
+                version += 1
+
+            removed_versions = {
+                symbol: removed_at for symbol, removed_at in previous.removed_versions.items()
+                if symbol not in snapshot.quotes
+            }
+            removed_versions.update((symbol, version) for symbol in removed)
+            self.snapshot = replace(
+                snapshot,
+                version=version,
+                symbol_versions=MappingProxyType({
+                    symbol: version if symbol in changed else previous.symbol_versions[symbol]
+                    for symbol in snapshot.quotes
+                }),
+                removed_versions=MappingProxyType(removed_versions)
+            )
+            self.polls += 1
+            if not snapshot.bridge_connected:
+                self.failures += 1
+        return previous
+
+    def stats(self):
+        snapshot = self.snapshot
+        age = snapshot.age()
+        return {
+            "poll_interval_seconds": self.poll_interval,
+            "polls": self.polls,
+            "failures": self.failures,
+            "bridge_connected": snapshot.bridge_connected,
+            "symbols": len(snapshot.quotes),
+            "version": snapshot.version,
+            "snapshot_at": snapshot.fetched_at,
+            "snapshot_age_seconds": round(age, 3) if age is not None else None,
+            "last_error": snapshot.error
+        }
+
+
+class TickRing:
+    """Fixed-capacity ring buffer of (time, bid, ask) stored in packed double arrays"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.bids = array("d", bytes(8 * capacity))
+        self.asks = array("d", bytes(8 * capacity))
+        self.head = 0  # next slot to write
+        self.size = 0
+
+    def append(self, timestamp, bid, ask):
+        head = self.head
+        self.times[head] = timestamp
+        self.bids[head] = bid
+        self.asks[head] = ask
+        self.head = (head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def _physical(self, index):
+        """Slot of the index-th oldest tick"""
+        if self.size < self.capacity:
+            return index
+        return (self.head + index) % self.capacity
+
+    def _bisect(self, bisect_func, timestamp):
+        """bisect_left/right over the ticks, oldest = 0, without copying the ring
+
+        A full ring holds two sorted runs, [head:] (older) then [:head]; each
+        is searched in place with lo/hi bounds.
+        """
+        if self.size < self.capacity:
+            return bisect_func(self.times, timestamp, 0, self.size)
+        older = self.capacity - self.head
+        index = bisect_func(self.times, timestamp, self.head, self.capacity) - self.head
+        if index < older:
+            return index
+        return older + bisect_func(self.times, timestamp, 0, self.head)
+
+    def _tick(self, index):
+        slot = self._physical(index)
+        return [self.times[slot], self.bids[slot], self.asks[slot]]
+
+    def downsample(self, since, points):
+        """Last tick of each of `points` equal time buckets after since, as [time, bid, ask] lists
+
+        O(points * log(size)): only the returned ticks are read.
+        """
+        if not self.size:
+            return []
+        start = self._bisect(bisect_left, since)
+        if start >= self.size:
+            return []
+
+        last_index = self.size - 1
+        first = self.times[self._physical(start)]
+        last = self.times[self._physical(last_index)]
+        if points <= 1 or last <= first:
+            return [self._tick(last_index)]
+
+        step = (last - first) / points
+        result = []
+        previous = -1
+        for bucket in range(1, points + 1):
+            boundary = last if bucket == points else first + step * bucket
+            index = self._bisect(bisect_right, boundary) - 1
+            if index > previous:
+                result.append(self._tick(index))
+                previous = index
+        return result
+
+
+class TickHistory:
+    """Per-symbol TickRing store, bounded in ticks per symbol and in symbols"""
+
+    def __init__(self, capacity=3600, max_symbols=500):
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self._rings = {}
+        self.appended = 0
+        self.rejected_symbols = 0
+
+    def append(self, symbol, timestamp, bid, ask):
+        ring = self._rings.get(symbol)
+        if ring is None:
+            if len(self._rings) >= self.max_symbols:
+                self.rejected_symbols += 1
+                return
+            ring = self._rings[symbol] = TickRing(self.capacity)
+        ring.append(timestamp, bid, ask)
+        self.appended += 1
+
+    def downsample(self, symbol, since, points):
+        """Downsampled ticks of symbol, or None if the symbol has no history"""
+        ring = self._rings.get(symbol)
+        if ring is None:
+            return None
+        return ring.downsample(since, points)
+
+    def stats(self):
+        return {
+            "symbols": len(self._rings),
+            "max_symbols": self.max_symbols,
+            "ticks_per_symbol": self.capacity,
+            "bytes_per_symbol": 3 * 8 * self.capacity,
+            "ticks_stored": sum(ring.size for ring in self._rings.values()),
+            "appended": self.appended,
+            "rejected_symbols": self.rejected_symbols
+        }
+
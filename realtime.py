@@ -0,0 +1,257 @@
+"""
+Real-time fan-out to connected clients
+
+SignalStreamBroker - Server-Sent Events stream of new signals.
+Signals are published from the ingest path, which runs in the threadpool or in
+the journal writer thread, and delivered to asyncio queues, one per connected
+client. A bounded history of recent events (keyed by signal id) lets
+reconnecting clients resume from Last-Event-ID. A client too slow to drain its
+queue is disconnected and resumes from the history when it reconnects.
+
+WebSocketHub - topic subscriptions over WebSocket (quotes:SYMBOL,
+signals:SYMBOL, vps:VPS_ID). Each update is serialized once and queued only
+on the connections subscribed to its topic. Every connection has a bounded
+send queue: quote updates are coalesced (only the latest per topic is kept),
+other events drop the oldest queued message when a client falls behind.
+"""
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict, deque
+
+
+def format_sse(data, event=None, event_id=None):
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StreamSubscriber:
+    """Bounded per-client queue bound to the event loop that serves the client"""
+
+    def __init__(self, loop, queue_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def _deliver(self, message):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class SignalStreamBroker:
+    """Thread-safe publisher with a resumable history of recent events"""
+
+    def __init__(self, history_size=1000, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history_size)  # (event_id, event, data)
+        # Events with id <= floor_id are not in the history (before startup or dropped)
+        self.floor_id = 0
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def set_floor(self, event_id):
+        with self._lock:
+            self.floor_id = max(self.floor_id, event_id or 0)
+
+    def subscribe(self):
+        subscriber = StreamSubscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        if subscriber.overflowed:
+            self.dropped_subscribers += 1
+
+    def publish(self, event, data, event_id=None):
+        """Publish from any thread; events with an id are kept for resume"""
+        with self._lock:
+            if event_id is not None:
+                if len(self._history) == self._history.maxlen:
+                    self.floor_id = max(self.floor_id, self._history[0][0])
+                self._history.append((event_id, event, data))
+            subscribers = list(self._subscribers)
+            self.published += 1
+
+        message = (event_id, event, data)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber._deliver, message)
+            except RuntimeError:
+                # Event loop closed (shutdown)
+                self.unsubscribe(subscriber)
+
+    def events_since(self, last_event_id):
+        """History events after last_event_id, or None if some may be missing"""
+        with self._lock:
+            if last_event_id < self.floor_id:
+                return None
+            return sorted(
+                (item for item in self._history if item[0] > last_event_id),
+                key=lambda item: item[0]
+            )
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "history": len(self._history),
+                "floor_id": self.floor_id,
+                "published": self.published,
+                "dropped_subscribers": self.dropped_subscribers
+            }
+
+
+class HubConnection:
+    """One WebSocket client: topics and a bounded, coalescing send queue"""
+
+    def __init__(self, websocket, loop, queue_size):
+        self.websocket = websocket
+        self.loop = loop
+        self.queue_size = queue_size
+        self.topics = set()
+        self._queue = deque()  # events and control messages, in order
+        self._latest = OrderedDict()  # topic -> latest coalesced message
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def deliver(self, topic, message, coalesce=False):
+        # Runs on the connection's event loop
+        if coalesce:
+            if topic in self._latest:
+                self.coalesced += 1
+            self._latest[topic] = message
+        else:
+            if len(self._queue) >= self.queue_size:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(message)
+        self._wakeup.set()
+
+    async def run_sender(self):
+        """Drain the queue to the socket; returns when the socket fails"""
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self._queue or self._latest:
+                    if self._queue:
+                        message = self._queue.popleft()
+                    else:
+                        _, message = self._latest.popitem(last=False)
+                    await self.websocket.send_text(message)
+                    self.sent += 1
+        except Exception:
+            return
+
+
+class WebSocketHub:
+    """Topic-indexed fan-out; publish() can be called from any thread"""
+
+    TOPIC_PREFIXES = ("quotes", "signals", "vps")
+
+    def __init__(self, queue_size=200, max_topics=100):
+        self.queue_size = queue_size
+        self.max_topics = max_topics
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._by_topic = {}  # topic -> set of HubConnection
+        self.published = 0
+
+    @classmethod
+    def valid_topic(cls, topic):
+        prefix, _, key = topic.partition(":")
+        return prefix in cls.TOPIC_PREFIXES and bool(key) and len(topic) <= 80
+
+    def connect(self, websocket):
+        connection = HubConnection(websocket, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._connections.add(connection)
+        return connection
+
+    def disconnect(self, connection):
+        with self._lock:
+            self._connections.discard(connection)
+            for topic in connection.topics:
+                subscribers = self._by_topic.get(topic)
+                if subscribers:
+                    subscribers.discard(connection)
+                    if not subscribers:
+                        del self._by_topic[topic]
+            connection.topics = set()
+
+    def subscribe(self, connection, topics):
+        """Subscribe to valid topics (within the per-connection limit); returns the accepted ones"""
+        accepted = []
+        with self._lock:
+            for topic in topics:
+                if not self.valid_topic(topic) or topic in connection.topics:
+                    continue
+                if len(connection.topics) >= self.max_topics:
+                    break
+                connection.topics.add(topic)
+                self._by_topic.setdefault(topic, set()).add(connection)
+                accepted.append(topic)
+        return accepted
+
+    def unsubscribe(self, connection, topics):
+        with self._lock:
+            for topic in topics:
+                if topic in connection.topics:
+                    connection.topics.discard(topic)
+                    subscribers = self._by_topic.get(topic)
+                    if subscribers:
+                        subscribers.discard(connection)
+                        if not subscribers:
+                            del self._by_topic[topic]
+
+    def send_control(self, connection, data):
+        """Reply to one client through its queue (the sender task owns the socket)"""
+        connection.deliver(None, json.dumps(data, default=str, separators=(",", ":")))
+
+    def publish(self, topic, data, coalesce=False):
+        """Send an update to subscribers of topic and of its wildcard (e.g. signals:*)"""
+        prefix = topic.partition(":")[0]
+        with self._lock:
+            subscribers = self._by_topic.get(topic, set()) | self._by_topic.get(f"{prefix}:*", set())
+            self.published += 1
+        if not subscribers:
+            return
+
+        # Serialize once for all subscribers
+        message = json.dumps({"topic": topic, "data": data}, default=str, separators=(",", ":"))
+        for connection in subscribers:
+            try:
+                connection.loop.call_soon_threadsafe(connection.deliver, topic, message, coalesce)
+            except RuntimeError:
+                # Event loop closed (shutdown)
+                self.disconnect(connection)
+
+    def stats(self):
+        with self._lock:
+            connections = list(self._connections)
+            topics = len(self._by_topic)
+        return {
+            "connections": len(connections),
+            "topics": topics,
+            "published": self.published,
+            "sent": sum(connection.sent for connection in connections),
+            "dropped": sum(connection.dropped for connection in connections),
+            "coalesced": sum(connection.coalesced for connection in connections)
+        }
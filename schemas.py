@@ -1,8 +1,12 @@
+import os
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from enum import Enum
 
+# Max signals accepted in a single batch push from VPS (checked during validation)
+VPS_SIGNAL_BATCH_MAX = int(os.getenv("VPS_SIGNAL_BATCH_MAX", "1000"))
+
 class SignalTypeEnum(str, Enum):
     BUY = "BUY"
     SELL = "SELL"
@@ -47,6 +51,9 @@ class Token(BaseModel):
     refresh_token: str
     token_type: str = "bearer"
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
 class TokenData(BaseModel):
     username: Optional[str] = None
 
@@ -93,12 +100,22 @@ class TopSignalsResponse(BaseModel):
     message: str = "Top 3 signals"
 
 class SignalFilter(BaseModel):
-    symbol: Optional[str] = None
+    symbol: Optional[str] = None  # exact symbol, or prefix ending with "*" (e.g. "EUR*")
     signal_type: Optional[SignalTypeEnum] = None
     min_reliability: Optional[float] = 0
+    max_reliability: Optional[float] = None
+    status: Optional[SignalStatusEnum] = None
     only_active: bool = True
-    page: int = Field(default=1, ge=1)
-    per_page: int = Field(default=10, ge=1, le=100)
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    cursor: Optional[str] = None  # next_cursor of the previous page
+    limit: int = Field(default=20, ge=1, le=100)
+
+class SignalPage(BaseModel):
+    status: str = "success"
+    signals: List[SignalOut]
+    count: int
+    next_cursor: Optional[str] = None
 
 # Signal execution schemas
 class SignalExecutionCreate(BaseModel):
@@ -161,12 +178,18 @@ class VPSHeartbeatOut(BaseModel):
 
 class VPSSignalReceive(BaseModel):
     vps_id: str
+    # Optional client key; if missing it is derived from vps_id + symbol + signal_type + generated_at
+    idempotency_key: Optional[str] = Field(default=None, min_length=1, max_length=64)
     signal: SignalCreate
     generated_at: datetime
     reliability: Optional[float] = None
     ai_analysis: Optional[str] = None
     confidence_score: Optional[float] = None
 
+class VPSSignalBatchReceive(BaseModel):
+    """Batch of VPS signals - each item is validated on its own as VPSSignalReceive"""
+    signals: List[Dict[str, Any]] = Field(..., min_length=1, max_length=VPS_SIGNAL_BATCH_MAX)
+
 class HealthCheckResponse(BaseModel):
     status: str = "healthy"
     timestamp: datetime
@@ -0,0 +1,329 @@
+"""
+In-process cache of the newest active public signals
+
+Dashboard read endpoints (/api/vps/signals/live, /api/signals/latest,
+/signals/top) are served from this buffer instead of querying the signals
+table on every poll. The buffer is loaded at startup, fed by the ingest path
+and bounded in size: the newest signals and the most reliable ones are kept
+in two buffers, and when one is full its lowest entries are dropped (see
+LiveSignalCache for when a read can still be answered).
+Expired (expires_at in the past) and deactivated signals are evicted.
+
+Every change to the buffer (load, ingest, deactivation, expiry) bumps a
+revision; marker() returns it so read endpoints can answer conditional
+requests (ETag / If-None-Match) without touching the database.
+
+List endpoints only carry a preview of ai_analysis: rows are read with
+signal_list_columns(), which truncates the text in SQL (one character more
+than the preview tells whether it was cut, without reading the whole value),
+and the full analysis is served by a separate detail endpoint.
+"""
+
+import threading
+import time
+from bisect import insort
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+
+from models import Signal
+
+# Characters of ai_analysis shown by list endpoints
+ANALYSIS_PREVIEW_CHARS = 200
+
+
+def _naive_utc(value):
+    """Normalize datetimes to naive UTC so DB rows and VPS payloads compare"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, "value") else value
+
+
+def signal_list_columns():
+    """Columns rendered by list endpoints, with ai_analysis truncated by the database"""
+    return [
+        Signal.id, Signal.symbol, Signal.signal_type, Signal.entry_price, Signal.stop_loss,
+        Signal.take_profit, Signal.reliability, Signal.status, Signal.confidence_score,
+        Signal.risk_level, Signal.is_public, Signal.is_active, Signal.created_at,
+        Signal.expires_at, Signal.vps_id, Signal.source,
+        func.substr(Signal.ai_analysis, 1, ANALYSIS_PREVIEW_CHARS + 1).label("ai_analysis")
+    ]
+
+
+def analysis_preview(analysis):
+    """ai_analysis cut to the preview length (signal_list_columns() reads one extra character)"""
+    return analysis[:ANALYSIS_PREVIEW_CHARS] if analysis else analysis
+
+
+def entry_from_values(values, signal_id):
+    """Cache entry from Signal column values (ingest path)"""
+    analysis = values.get("ai_analysis")
+    return {
+        "id": signal_id,
+        "symbol": values["symbol"],
+        "signal_type": _enum_value(values["signal_type"]),
+        "entry_price": values["entry_price"],
+        "stop_loss": values.get("stop_loss"),
+        "take_profit": values.get("take_profit"),
+        "reliability": values.get("reliability") or 0.0,
+        "status": _enum_value(values.get("status")) or "ACTIVE",
+        "ai_analysis": analysis_preview(analysis),
+        "ai_analysis_truncated": bool(analysis) and len(analysis) > ANALYSIS_PREVIEW_CHARS,
+        "confidence_score": values.get("confidence_score") or 0.0,
+        "risk_level": values.get("risk_level") or "MEDIUM",
+        "is_public": values.get("is_public", True),
+        "is_active": values.get("is_active", True),
+        "created_at": _naive_utc(values.get("created_at")) or datetime.utcnow(),
+        "expires_at": _naive_utc(values.get("expires_at")),
+        "vps_id": values.get("vps_id"),
+        "source": values.get("source") or "VPS_AI"
+    }
+
+
+def entry_from_row(signal):
+    """Cache entry from a Signal ORM row or a signal_list_columns() row"""
+    values = {
+        column: getattr(signal, column)
+        for column in (
+            "symbol", "signal_type", "entry_price", "stop_loss", "take_profit",
+            "reliability", "status", "ai_analysis", "confidence_score", "risk_level",
+            "is_public", "is_active", "created_at", "expires_at", "vps_id", "source"
+        )
+    }
+    return entry_from_values(values, signal.id)
+
+
+class LiveSignalCache:
+    """Bounded buffers of active public signals: newest by (created_at, id), top by (reliability, id)
+
+    Each buffer keeps at most `capacity` entries and a floor: every active
+    public signal whose key is >= the floor is in the buffer (None: every
+    signal is). Dropping the lowest entry for capacity raises the floor; a
+    read is answered from the cache when its result cannot include a signal
+    below the floor, otherwise it is a miss and the caller queries the DB.
+    Expiry and deactivation only remove inactive signals, so they keep the
+    invariant but may leave the buffer short: refill() reloads it then.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._entries = []  # ascending (created_at, id, entry)
+        self._by_reliability = []  # ascending (reliability, id, entry)
+        self._ids = set()
+        self._top_ids = set()
+        self._newest_floor = None  # (created_at, id)
+        self._top_floor = None  # (reliability, id)
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.reloads = 0
+        # Process start in ms keeps markers unique across restarts (revision restarts at 0)
+        self.epoch = int(time.time() * 1000)
+        self.revision = 0
+        self._next_expiry = None
+
+    def load(self, session_factory):
+        """(Re)load the newest and the most reliable active public signals from the database
+
+        Returns False (nothing replaced) if the cache changed while querying.
+        """
+        with self._lock:
+            revision = self.revision
+        db = session_factory()
+        try:
+            live = (Signal.is_active == True) & (Signal.is_public == True)
+            newest = [entry_from_row(row) for row in db.query(*signal_list_columns()).filter(live).order_by(
+                Signal.created_at.desc(), Signal.id.desc()
+            ).limit(self.capacity).all()]
+            top = [entry_from_row(row) for row in db.query(*signal_list_columns()).filter(live).order_by(
+                Signal.reliability.desc().nulls_last(), Signal.id.desc()
+            ).limit(self.capacity).all()]
+        finally:
+            db.close()
+
+        with self._lock:
+            if self.loaded and self.revision != revision:
+                # An ingest/deactivation raced the query: keep the live state, retry later
+                return False
+            self._entries = sorted((entry["created_at"], entry["id"], entry) for entry in newest)
+            self._by_reliability = sorted((entry["reliability"], entry["id"], entry) for entry in top)
+            self._ids = {entry["id"] for entry in newest}
+            self._top_ids = {entry["id"] for entry in top}
+            self._newest_floor = self._entries[0][:2] if len(newest) >= self.capacity else None
+            self._top_floor = self._by_reliability[0][:2] if len(top) >= self.capacity else None
+            self.loaded = True
+            self._update_next_expiry()
+            self.revision += 1
+        print(f"Live signal cache loaded: {len(newest)} signals")
+        return True
+
+    def refill(self, session_factory):
+        """Reload if removals left a buffer below capacity while signals may be missing"""
+        with self._lock:
+            short = (
+                (self._newest_floor is not None and len(self._entries) < self.capacity) or
+                (self._top_floor is not None and len(self._by_reliability) < self.capacity)
+            )
+        if short and self.load(session_factory):
+            self.reloads += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._by_reliability = []
+            self._ids = set()
+            self._top_ids = set()
+            self._newest_floor = None
+            self._top_floor = None
+            self._next_expiry = None
+            self.revision += 1
+
+    @staticmethod
+    def _insert(items, item, floor, capacity):
+        """insort item unless it is below the floor of a full buffer; returns (new floor, dropped ids)"""
+        if floor is not None and item[:2] < floor:
+            return floor, {item[1]}
+        insort(items, item)
+        dropped = set()
+        while len(items) > capacity:
+            dropped.add(items.pop(0)[1])
+            floor = max(floor, items[0][:2]) if floor is not None else items[0][:2]
+        return floor, dropped
+
+    def add_many(self, entries):
+        """Insert newly ingested signals"""
+        if not entries:
+            return
+        with self._lock:
+            self.revision += 1
+            for entry in entries:
+                if not (entry["is_public"] and entry["is_active"]) or entry["id"] in self._ids or entry["id"] in self._top_ids:
+                    continue
+                self._newest_floor, dropped = self._insert(
+                    self._entries, (entry["created_at"], entry["id"], entry), self._newest_floor, self.capacity
+                )
+                self._ids.add(entry["id"])
+                self._ids -= dropped
+                self._top_floor, dropped = self._insert(
+                    self._by_reliability, (entry["reliability"], entry["id"], entry), self._top_floor, self.capacity
+                )
+                self._top_ids.add(entry["id"])
+                self._top_ids -= dropped
+                expires_at = entry["expires_at"]
+                if expires_at and (self._next_expiry is None or expires_at < self._next_expiry):
+                    self._next_expiry = expires_at
+
+    def _remove(self, removed_ids):
+        self._entries = [item for item in self._entries if item[1] not in removed_ids]
+        self._by_reliability = [item for item in self._by_reliability if item[1] not in removed_ids]
+        self._ids -= removed_ids
+        self._top_ids -= removed_ids
+
+    def discard(self, signal_ids):
+        """Evict deactivated signals"""
+        with self._lock:
+            # Deactivations change the database answer even for signals not buffered
+            self.revision += 1
+            signal_ids = set(signal_ids) & (self._ids | self._top_ids)
+            if not signal_ids:
+                return
+            self._remove(signal_ids)
+            self.evicted += len(signal_ids)
+
+    def _update_next_expiry(self):
+        expiries = [
+            item[2]["expires_at"] for item in self._entries + self._by_reliability if item[2]["expires_at"]
+        ]
+        self._next_expiry = min(expiries) if expiries else None
+
+    def _evict_expired(self, now):
+        if self._next_expiry is None or now < self._next_expiry:
+            return
+        expired = {
+            item[1] for item in self._entries + self._by_reliability
+            if item[2]["expires_at"] and item[2]["expires_at"] <= now
+        }
+        if expired:
+            self._remove(expired)
+            self.evicted += len(expired)
+            self.revision += 1
+        self._update_next_expiry()
+
+    def marker(self):
+        """(epoch, revision) identifying the current content, or None before the first load"""
+        with self._lock:
+            if not self.loaded:
+                return None
+            self._evict_expired(datetime.utcnow())
+            return self.epoch, self.revision
+
+    def latest(self, limit, source=None):
+        """Newest signals first, or None (cache miss) if the buffer cannot answer"""
+        with self._lock:
+            if not self.loaded:
+                self.misses += 1
+                return None
+            self._evict_expired(datetime.utcnow())
+            floor = self._newest_floor
+            result = []
+            for item in reversed(self._entries):
+                if floor is not None and item[:2] < floor:
+                    break
+                entry = item[2]
+                if source and entry["source"] != source:
+                    continue
+                result.append(entry)
+                if len(result) >= limit:
+                    break
+            if len(result) < limit and floor is not None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def top(self, limit, min_reliability=0.0):
+        """Highest reliability signals, or None (cache miss) if the buffer cannot answer"""
+        with self._lock:
+            if not self.loaded:
+                self.misses += 1
+                return None
+            self._evict_expired(datetime.utcnow())
+            floor = self._top_floor
+            result = []
+            for item in reversed(self._by_reliability):
+                if item[0] < min_reliability or (floor is not None and item[:2] < floor):
+                    break
+                result.append(item[2])
+                if len(result) >= limit:
+                    break
+            # Signals missing from the buffer rank below the floor: they only matter if they can qualify
+            if len(result) < limit and floor is not None and floor[0] >= min_reliability:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+            top_size = len(self._by_reliability)
+            complete = self._newest_floor is None and self._top_floor is None
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "top_size": top_size,
+            "capacity": self.capacity,
+            "complete": complete,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evicted": self.evicted,
+            "reloads": self.reloads,
+            "revision": self.revision
+        }
@@ -90,6 +90,71 @@ def test_signal_receive():
         print(f"Error: {e}")
         return False
 
+def test_signal_retry_deduplicated():
+    """Test that a retried signal push is not stored twice"""
+    print("\n Testing signal retry deduplication...")
+    
+    signal_data = {
+        "vps_id": "vps-test-001",
+        "generated_at": datetime.now().isoformat(),
+        "signal": {
+            "symbol": "USDCHF",
+            "signal_type": "BUY",
+            "entry_price": 0.8850
+        }
+    }
+    
+    try:
+        first = requests.post(f"{BASE_URL}/api/signals/receive", json=signal_data, headers=HEADERS)
+        retry = requests.post(f"{BASE_URL}/api/signals/receive", json=signal_data, headers=HEADERS)
+        print(f"Status: {first.status_code} / {retry.status_code}")
+        print(f"Retry response: {json.dumps(retry.json(), indent=2)}")
+        return (
+            retry.json().get("status") == "duplicate"
+            and retry.json()["data"]["signal_id"] == first.json()["data"]["signal_id"]
+        )
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
+def test_signal_batch_receive():
+    """Test batch signal receive endpoint"""
+    print("\n Testing signal batch receive...")
+    
+    batch_data = {
+        "signals": [
+            {
+                "vps_id": "vps-test-001",
+                "generated_at": datetime.now().isoformat(),
+                "reliability": 80.0,
+                "signal": {
+                    "symbol": symbol,
+                    "signal_type": "SELL",
+                    "entry_price": price,
+                    "stop_loss": price * 1.005,
+                    "take_profit": price * 0.99
+                }
+            }
+            for symbol, price in [("GBPUSD", 1.2650), ("USDJPY", 149.50), ("AUDUSD", 0.6550)]
+        ]
+    }
+    # One invalid item: must be reported without blocking the others
+    batch_data["signals"].append({"vps_id": "vps-test-001", "signal": {"symbol": "EURUSD"}})
+    
+    try:
+        response = requests.post(
+            f"{BASE_URL}/api/signals/receive/batch",
+            json=batch_data,
+            headers=HEADERS
+        )
+        print(f"Status: {response.status_code}")
+        print(f"Response: {json.dumps(response.json(), indent=2)}")
+        data = response.json().get("data") or {}
+        return response.status_code == 200 and data.get("saved") == 3 and data.get("failed") == 1
+    except Exception as e:
+        print(f"Error: {e}")
+        return False
+
 def test_latest_signals():
     """Test latest signals endpoint"""
     print("\n Testing latest signals...")
@@ -170,6 +235,8 @@ def main():
         ("Health Check", test_health_check),
         ("VPS Heartbeat", test_vps_heartbeat),
         ("Signal Receive", test_signal_receive),
+        ("Signal Retry Dedup", test_signal_retry_deduplicated),
+        ("Signal Batch Receive", test_signal_batch_receive),
         ("Latest Signals", test_latest_signals),
         ("VPS Status", test_vps_status),
         ("Invalid API Key", test_invalid_api_key)